@@ -0,0 +1,13 @@
+from wot_stories.benchmark import benchmark, compare
+import sys
+
+if __name__ == '__main__':
+    # python benchmark.py                      run the suite and save benchmarks/<commit>.json
+    # python benchmark.py compare a.json b.json  compare the throughput of two saved runs
+    if len(sys.argv) > 1 and sys.argv[1] == 'compare':
+        for (engine, size, before, after) in compare(sys.argv[2], sys.argv[3]):
+            if before and after:
+                print("{0} - {1} identities : {2:.2f} -> {3:.2f} turns/s ({4:+.1f}%)".format(
+                    engine, size, before, after, (after / before - 1) * 100))
+    else:
+        benchmark()
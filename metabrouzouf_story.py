@@ -1,65 +1,158 @@
 from wot_stories.wot import WoT, plt
+from wot_stories.events import EventSink, CounterSubscriber
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
 import json
+import os
+import pickle
 import sqlite3
 
+# Columns needed to replay the wot, in the order parse_block expects them
+BLOCK_COLUMNS = "number, identities, certifications"
+# Wot parameters a checkpoint must have been replayed with to be resumed
+CHECKPOINT_PARAMETERS = ('sig_period', 'sig_stock', 'sig_validity', 'sig_qty', 'xpercent', 'steps_max')
 
-def parse_block(wot, block_row, id_col, cert_col):
+
+def parse_block(block_row):
+    """
+    Extract identities and certifications from a block
+    :param block_row: (number, identities, certifications) row of the block table
+    :return: (block number, [pub_key, …], [(issuer pub_key, certified pub_key), …])
+    """
     certifications = []
     identities = []
 
-    if block_row[id_col]:
-        id_str = "{{\"i\": {0}}}".format(block_row[id_col])
-        idties = json.loads(id_str)
-        for i in idties['i']:
+    if block_row[1]:
+        for i in json.loads(block_row[1]):
             isplit = i.split(':')
             identities.append(isplit[0])
 
-    if block_row[cert_col]:
-        cert_str = "{{\"i\": {0}}}".format(block_row[cert_col])
-        certs = json.loads(cert_str)
-        for c in certs['i']:
+    if block_row[2]:
+        for c in json.loads(block_row[2]):
             csplit = c.split(':')
             certifications.append((csplit[0], csplit[1]))
 
-    return identities, certifications
+    return block_row[0], identities, certifications
+
+
+def parse_blocks(block_rows):
+    return [parse_block(b) for b in block_rows]
+
+
+def read_blocks(cursor, batch_size):
+    while True:
+        blocks = cursor.fetchmany(batch_size)
+        if not blocks:
+            break
+        yield blocks
+
+
+def feed_blocks(wot, blocks):
+    """
+    Replay parsed blocks in the wot
+    :return: Number of the last block replayed
+    """
+    for number, identities, certs in blocks:
+        for i in identities:
+            wot.add_identity(i)
+
+        for c in certs:
+            wot.add_link(c[0], c[1])
+
+        wot.next_turn()
+    return number
 
 
-def from_sqlite(wot, filepath):
+def replay_source(wot, filepath):
+    """
+    :return: Database and wot parameters a checkpoint is replayed from
+    """
+    return {'database': os.path.abspath(filepath),
+            'parameters': {p: getattr(wot, p) for p in CHECKPOINT_PARAMETERS}}
+
+
+def load_checkpoint(wot, checkpoint, filepath):
+    """
+    Restore the wot from a checkpoint. A checkpoint replayed from another database
+    or with other wot parameters is ignored, so that the whole chain is replayed.
+    :return: Number of the last block replayed in the checkpoint, None if there is no usable checkpoint
+    """
+    if not checkpoint or not os.path.exists(checkpoint):
+        return None
+    with open(checkpoint, "rb") as infile:
+        saved = pickle.load(infile)
+    source = replay_source(wot, filepath)
+    if saved.get('source') != source:
+        print("Checkpoint {0} ignored, it was replayed from {1} instead of {2}".format(checkpoint,
+                                                                                      saved.get('source'),
+                                                                                      source))
+        return None
+    wot.set_state(saved['wot'])
+    return saved['block']
+
+
+def save_checkpoint(wot, checkpoint, block, filepath):
+    """
+    Save the wot state, the number of the last block replayed and what it was replayed from
+    """
+    with open(checkpoint + ".tmp", "wb") as outfile:
+        pickle.dump({'block': block, 'source': replay_source(wot, filepath), 'wot': wot.get_state()}, outfile)
+    os.replace(checkpoint + ".tmp", checkpoint)
+
+
+def from_sqlite(wot, filepath, batch_size=500, processes=None, checkpoint=None):
+    """
+    Replay the blocks of a Duniter database in the wot.
+    Blocks are read by batches and parsed in a process pool, while the
+    wot is fed in block order with the batches already parsed.
+    :param wot: The WoT to feed
+    :param filepath: Path of the sqlite database
+    :param batch_size: Number of blocks parsed by a worker at once
+    :param processes: Number of parsing processes, defaults to the number of cores
+    :param checkpoint: Path of a checkpoint file. If it exists and was replayed from the same database
+                       with the same wot parameters, the wot is restored from it and only the blocks
+                       added since are replayed. It is updated at the end.
+    """
     conn = sqlite3.connect(filepath)
 
     cursor = conn.cursor()
 
-    cursor.execute('SELECT * FROM block WHERE fork=0')
-    columns = [d[0] for d in cursor.description]
-    id_col = columns.index('identities')
-    cert_col = columns.index('certifications')
-
-    block_zero = cursor.fetchone()
-    identities, certs = parse_block(wot, block_zero, id_col, cert_col)
-    wot.initialize(identities, certs)
-    fetching = True
-    count = 0
-    while fetching:
-        blocks = cursor.fetchmany(50)
-        count += 50
-        for b in blocks:
-            identities, certs = parse_block(wot, b, id_col, cert_col)
-            for i in identities:
-                wot.add_identity(i)
-
-            for c in certs:
-                wot.add_link(c[0], c[1])
-
-            wot.next_turn()
-        if len(blocks) < 50:
-            fetching = False
+    number = load_checkpoint(wot, checkpoint, filepath)
+    if number is None:
+        cursor.execute('SELECT {0} FROM block WHERE fork=0 ORDER BY number'.format(BLOCK_COLUMNS))
+
+        block_zero = cursor.fetchone()
+        number, identities, certs = parse_block(block_zero)
+        wot.initialize(identities, certs)
+    else:
+        cursor.execute('SELECT {0} FROM block WHERE fork=0 AND number > ? ORDER BY number'.format(BLOCK_COLUMNS),
+                       (number,))
+
+    processes = processes or os.cpu_count()
+    with ProcessPoolExecutor(processes) as executor:
+        # Keep a bounded number of batches in flight so that the whole chain is never held in memory
+        window = 2 * processes
+        pending = deque()
+        for blocks in read_blocks(cursor, batch_size):
+            pending.append(executor.submit(parse_blocks, blocks))
+            if len(pending) >= window:
+                number = feed_blocks(wot, pending.popleft().result())
+        while pending:
+            number = feed_blocks(wot, pending.popleft().result())
 
     conn.close()
 
+    if checkpoint:
+        save_checkpoint(wot, checkpoint, number, filepath)
+
 if __name__ == '__main__':
-    wot = WoT(sig_period=0, sig_stock=100, sig_validity=10800, sig_qty=3, xpercent=1, steps_max=3)
-    from_sqlite(wot, 'metabrouzouf.db')
+    counter = CounterSubscriber()
+    events = EventSink()
+    events.subscribe(counter)
+    wot = WoT(sig_period=0, sig_stock=100, sig_validity=10800, sig_qty=3, xpercent=1, steps_max=3, events=events)
+    from_sqlite(wot, 'metabrouzouf.db', checkpoint='metabrouzouf.checkpoint')
+    print(dict(counter.counts))
     wot.draw(0.01)
     plt.savefig('out.png', dpi=192, facecolor='w', edgecolor='w',
         orientation='portrait')
-    plt.show()
\ No newline at end of file
+    plt.show()
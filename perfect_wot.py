@@ -1,49 +1,100 @@
 from wot_stories.fast_wot import WoT, plt
+from wot_stories.sweep import grid, sweep
+from wot_stories.backends import make_backend, SERIAL, THREAD, PROCESS
+from wot_stories.stats import PHASES
+from wot_stories.batch import render_turns
 import numpy as np
 import logging
+import sys
 from graph_tool.all import *
 import asyncio
 
 NB_TURN = 20 * 4
+# Identities issue certifications during this number of turns after their arrival
+ACTIVITY_TURNS = 80 * 4
+# Identities stop issuing certifications above this number of valid ones
+MAX_ISSUED = 45
+# Number of members whose draw probabilities are computed at once
+CHUNK_SIZE = 1024
 
-#@profile
-async def run():
-    global NB_TURN
-    def process(vertex):
-        if vertex in wot.history and turn < wot.history[vertex][0] + 80 * 4:
-            if 0 <= wot.wot[wot.turn].vertex(vertex).out_degree() < 45:
-                nearest_array = 1 / (1 + 1* np.array(distance[vertex]))
-                pond = (nearest_array) / np.sum(nearest_array)
-                nb_members = len(wot.members[wot.turn])
-                nb_identities = len(wot.identities[wot.turn])
-                # pond = (100*nearest_array * members_array * 0.5*need_certs_array) / \
-                #       np.sum(100*nearest_array * members_array * 0.5*need_certs_array)
-                if turn % 3 == 0 \
-                        and nb_members / nb_identities > 0.5 \
-                        and magnet[vertex] <= 0.2:
-                    new_id = wot.add_identity()
-                    wot.add_link(vertex, new_id)
-                    magnet[new_id] = np.random.pareto(1)
-                for i in range(0, np.random.randint(0, int(magnet[vertex] + wot.sig_stock / wot.sig_validity))):
-                    new_link_id = np.random.choice(wot.identities[wot.turn], p=pond)
-                    wot.add_link(vertex, new_link_id)
-
-    wot = WoT(sig_period=0, sig_stock=48, sig_validity=4, sig_qty=5, xpercent=0.9, steps_max=0)
+
+def grow_turn(wot, turn, magnet, born):
+    """
+    Draw the new identities and the certifications of all the active members for a turn,
+    with a single batch of numpy operations
+    :param wot: The WoT to grow
+    :param turn: Turn of the simulation
+    :param magnet: Array of the attractiveness of each identity
+    :param born: Array of the arrival turn of each identity
+    :return: (members creating a new identity, certifications issuers, certifications targets) arrays
+    """
+    # Nothing was added since the turn was committed : the live graph is the graph of the turn,
+    # reading it does not rebuild a copy of the turn in the history cache
+    graph = wot.wot.live
+    nb_identities = graph.num_vertices()
+    members = wot.members[wot.turn].array()
+    active = members[(turn < born[members] + ACTIVITY_TURNS) & (graph.get_out_degrees(members) < MAX_ISSUED)]
+
+    if turn % 3 == 0 and len(members) / nb_identities > 0.5:
+        spawners = active[magnet[active] <= 0.2]
+    else:
+        spawners = active[:0]
+
+    nb_links = np.random.randint(0, np.maximum(1, (magnet[active] + wot.sig_stock / wot.sig_validity).astype(int)))
+    issuers = np.repeat(active, nb_links)
+    targets = np.empty(len(issuers), dtype=np.int64)
+    ends = np.cumsum(nb_links)
+
+    # Certifications targets are drawn with a probability decreasing with the distance to the issuer :
+    # the cumulated probabilities of each row are shifted by the row number, so that all the draws
+    # are a single search in the flattened rows
+    distance = shortest_distance(graph, directed=False, max_dist=0).get_2d_array(np.arange(nb_identities))
+    for start in range(0, len(active), CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, len(active))
+        first = ends[start - 1] if start > 0 else 0
+        cdf = np.cumsum(1 / (1 + distance[:, active[start:stop]].T.astype(float)), axis=1)
+        cdf /= cdf[:, -1:]
+        cdf[:, -1] = 1
+        cdf += np.arange(stop - start)[:, None]
+        rows = np.repeat(np.arange(stop - start), nb_links[start:stop])
+        picks = np.searchsorted(cdf.ravel(), np.random.random(len(rows)) + rows, side='right')
+        targets[first:ends[stop - 1]] = np.minimum(picks - rows * nb_identities, nb_identities - 1)
+
+    return spawners, issuers, targets
+
+
+async def simulate(wot, nb_turns=NB_TURN, on_turn=None):
+    """
+    Grow a wot with the perfect growth model
+    :param wot: The WoT to grow
+    :param nb_turns: Maximum number of turns
+    :param on_turn: Called with the wot after each turn
+    """
     wot.initialize(6)
-    magnet = {}
-    for i in wot.identities[0]:
-        magnet[i] = np.random.pareto(1)
-    print(magnet)
-
-    for turn in range(0, NB_TURN):
-        #need_certs_array = np.array([max(1, 5 - wot.wot[wot.turn].vertex(v).in_degree())
-        #                             for v in wot.identities[wot.turn]])
-        #members_array = np.array([1 if k in wot.members[wot.turn] else 1
-        #                          for k in wot.identities[wot.turn]])
-        distance = shortest_distance(wot.wot[wot.turn], directed=False, max_dist=0)
-        process_list = []
-        for vertex in wot.members[wot.turn]:
-            process_list.append(loop.run_in_executor(None, process, vertex))
+    magnet = np.random.pareto(1, len(wot.identities[0]))
+    born = np.zeros(len(magnet), dtype=np.int64)
+
+    for turn in range(0, nb_turns):
+        spawners, issuers, targets = grow_turn(wot, turn, magnet, born)
+
+        new_ids = wot.add_identities(len(spawners))
+        magnet = np.concatenate((magnet, np.random.pareto(1, len(new_ids))))
+        born = np.concatenate((born, np.full(len(new_ids), wot.turn + 1, dtype=np.int64)))
+        wot.add_links(spawners, new_ids)
+        wot.add_links(issuers, targets)
+
+        await wot.next_turn()
+        if on_turn:
+            on_turn(wot)
+        if len(wot.members[wot.turn]) == 0:
+            break
+    wot.end()
+
+
+async def run(backend=SERIAL):
+    global NB_TURN
+
+    def progress(wot):
         print('\r[{0}{1}] {2:10.2f}% - Turn {3} : {4} members, {5} identities'.format(
             '#' * int(wot.turn / NB_TURN * 10),
             ' ' * (
@@ -52,14 +103,33 @@ async def run():
             wot.turn,
             len(wot.members[wot.turn]),
             len(wot.identities[wot.turn])))
-        await asyncio.gather(*process_list)
-        await wot.next_turn()
         if len(wot.members[wot.turn]) == 0:
             print("No more members. Community died")
-            break
-    wot.end()
+
+    wot = WoT(sig_period=0, sig_stock=48, sig_validity=4, sig_qty=5, xpercent=0.9, steps_max=0,
+              backend=make_backend(backend))
+    await simulate(wot, NB_TURN, progress)
+    wot.backend.close()
+    totals = wot.stats.totals()
+    for phase in PHASES:
+        logging.info("{0} backend - {1} : {2:.3f}s".format(backend, phase, totals[phase]))
+    wot.stats.to_csv('perfect_stats.csv')
     wot.save('perfect')
 
+
+def explore():
+    """
+    Sweep the protocol parameters of the perfect growth model over several seeds
+    """
+    parameters = grid({'sig_period': 0, 'sig_stock': 48, 'sig_validity': 4, 'sig_qty': 5,
+                       'xpercent': 0.9, 'steps_max': 0},
+                      sig_qty=[3, 5, 7],
+                      xpercent=[0.5, 0.7, 0.9],
+                      steps_max=[0, 3, 5],
+                      sig_validity=[4, 8, 12],
+                      sig_stock=[24, 48])
+    sweep(simulate, parameters, seeds=range(0, 10), nb_turns=NB_TURN, output='perfect_sweep.csv')
+
 def display():
     global NB_TURN
     wot = WoT(sig_period=0, sig_stock=45, sig_validity=12, sig_qty=3, xpercent=0.1, steps_max=2)
@@ -70,18 +140,14 @@ def display():
     for i in range(0, NB_TURN):
         if len(wot.members[i]) == maxlen:
             turn = i
-#
-    for i in range(int(turn/2)-5, int(turn/2)):
-        wot.draw_turn(i, "perfect")
-#
-    for i in range(turn-5, turn):
-        wot.draw_turn(i, "perfect")
+
+    render_turns('perfect', list(range(int(turn/2)-5, int(turn/2))) + list(range(turn-5, turn)), "perfect")
     #wot.draw()
     plt.show()
 
-async def main(loop):
+async def main(loop, backend=SERIAL):
     graph_tool.show_config()
-    await run()
+    await run(backend)
     display()
 
 if __name__ == '__main__':
@@ -89,6 +155,11 @@ if __name__ == '__main__':
     logging.basicConfig(format='%(levelname)s:%(module)s:%(funcName)s:%(message)s',
                         level=logging.INFO)
 
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(main(loop))
-    loop.close()
+    if len(sys.argv) > 1 and sys.argv[1] == 'sweep':
+        explore()
+    else:
+        # python perfect_wot.py [serial|thread|process]
+        backend = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] in (SERIAL, THREAD, PROCESS) else SERIAL
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(main(loop, backend))
+        loop.close()
@@ -1,7 +1,10 @@
 from wot_stories.wot import WoT, plt
+from wot_stories.events import EventSink, PrintSubscriber
 
 if __name__ == '__main__':
-    wot = WoT(sig_period=2, sig_stock=5, sig_validity=3, sig_qty=2, xpercent=0.9, steps_max=2)
+    events = EventSink()
+    events.subscribe(PrintSubscriber())
+    wot = WoT(sig_period=2, sig_stock=5, sig_validity=3, sig_qty=2, xpercent=0.9, steps_max=2, events=events)
     wot.initialize(['A', 'B', 'C'],
                    [('A', 'B'),
                     ('A', 'C'),
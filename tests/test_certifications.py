@@ -0,0 +1,90 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from wot_stories.certifications import CertificationLog
+from wot_stories.storage import save_arrays, load_arrays
+
+
+def random_log(seed):
+    """
+    :return: (certification log, [(turn, issuer, receiver), …] in issuing order)
+    """
+    random = np.random.RandomState(seed)
+    log = CertificationLog()
+    expected = []
+    # Some turns have no certifications, so that the turn index has gaps
+    for turn in range(0, 40, 2):
+        for _ in range(random.randint(0, 4)):
+            issuer, receiver = random.randint(0, 10, 2).tolist()
+            log.append(turn, issuer, receiver)
+            expected.append((turn, issuer, receiver))
+        issuers, receivers = random.randint(0, 10, (2, random.randint(0, 4)))
+        log.extend(turn, issuers, receivers)
+        expected.extend((turn, i, r) for (i, r) in zip(issuers.tolist(), receivers.tolist()))
+    return log, expected
+
+
+def rows(*columns):
+    return list(zip(*[c.tolist() for c in columns]))
+
+
+RANGES = [(0, 39), (3, 7), (4, 4), (5, 5), (-3, 100), (38, 50), (40, 50), (7, 3)]
+
+
+def check_queries(log, expected):
+    assert len(log) == len(expected)
+    assert list(log) == expected
+    for (first, last) in RANGES:
+        assert rows(*log.between(first, last)) == [c for c in expected if first <= c[0] <= last]
+    for issuer in range(0, 11):
+        assert rows(*log.issued_by(issuer)) == [(t, r) for (t, i, r) in expected if i == issuer]
+
+
+def test_queries():
+    for seed in range(0, 10):
+        check_queries(*random_log(seed))
+
+
+def test_issued_by_follows_appends():
+    log, expected = random_log(0)
+    log.issued_by(1)
+    log.append(40, 1, 2)
+    expected.append((40, 1, 2))
+    check_queries(log, expected)
+
+
+def test_append_before_latest_block():
+    log, _ = random_log(0)
+    with pytest.raises(ValueError):
+        log.append(3, 1, 2)
+
+
+def test_from_array(tmp_path):
+    log, expected = random_log(1)
+    save_arrays(str(tmp_path), {'past_links': log.array()})
+    loaded = CertificationLog.from_array(load_arrays(str(tmp_path), ['past_links'])['past_links'])
+    check_queries(loaded, expected)
+    assert len(CertificationLog.from_array(CertificationLog().array())) == 0
+
+
+def test_interned_keys():
+    log = CertificationLog(interned=True)
+    log.append(0, 'A', 'B')
+    log.append(1, 'B', 'C')
+    log.append(1, 'A', 'C')
+    assert list(log) == [(0, 'A', 'B'), (1, 'B', 'C'), (1, 'A', 'C')]
+
+    turns, receivers = log.issued_by('A')
+    assert turns.tolist() == [0, 1]
+    assert [log.key(r) for r in receivers] == ['B', 'C']
+    assert len(log.issued_by('Z')[0]) == 0
+
+    turns, issuers, receivers = log.between(1, 1)
+    assert [(t, log.key(i), log.key(r)) for (t, i, r) in rows(turns, issuers, receivers)] == \
+        [(1, 'B', 'C'), (1, 'A', 'C')]
+
+    restored = pickle.loads(pickle.dumps(log))
+    assert list(restored) == list(log)
+    assert restored.issued_by('B')[0].tolist() == [1]
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from wot_stories import csr_wot
+from wot_stories.benchmark import PARAMETERS, NB_FOUNDERS, synthetic_story
+from wot_stories.events import EventSink, LINK_ADDED, LINK_REJECTED, JOINED, LEFT
+
+# Tighter rules than the benchmark ones, so that certifications get rejected for both reasons
+STRICT = dict(PARAMETERS, sig_period=1, sig_stock=6, sig_validity=8)
+
+
+def replay(module, story, parameters, bulk=False):
+    """
+    Replay a synthetic story in an engine
+    :return: (members of each turn, events emitted)
+    """
+    events = []
+    sink = EventSink()
+    sink.subscribe(lambda *event: events.append(event), (LINK_ADDED, LINK_REJECTED, JOINED, LEFT))
+    wot = module.WoT(events=sink, **parameters)
+    wot.initialize(NB_FOUNDERS)
+    loop = asyncio.new_event_loop()
+    members = []
+    for (nb_new, sources, targets) in story:
+        if bulk:
+            wot.add_identities(nb_new)
+            wot.add_links(sources, targets)
+        else:
+            for _ in range(nb_new):
+                wot.add_identity()
+            for (source, target) in zip(sources.tolist(), targets.tolist()):
+                wot.add_link(source, target)
+        loop.run_until_complete(wot.next_turn())
+        members.append(sorted(wot.members[wot.turn]))
+    loop.close()
+    return members, events
+
+
+@pytest.mark.parametrize("parameters", [PARAMETERS, STRICT])
+def test_csr_wot_matches_fast_wot(parameters):
+    pytest.importorskip("graph_tool")
+    from wot_stories import fast_wot
+
+    story = synthetic_story(300, 40, seed=1)
+    assert replay(csr_wot, story, parameters) == replay(fast_wot, story, parameters)
+
+
+@pytest.mark.parametrize("parameters", [PARAMETERS, STRICT])
+def test_bulk_links_match_single_links(parameters):
+    story = synthetic_story(300, 40, seed=1)
+    members, events = replay(csr_wot, story, parameters)
+    bulk_members, bulk_events = replay(csr_wot, story, parameters, bulk=True)
+
+    assert bulk_members == members
+    assert any(len(m) > NB_FOUNDERS for m in members)
+    # Events of a batch are grouped by kind, their order differs but not their content
+    assert sorted(bulk_events, key=repr) == sorted(events, key=repr)
@@ -0,0 +1,56 @@
+import numpy as np
+
+from wot_stories.membership import MembershipTable
+from wot_stories.storage import save_arrays, load_arrays
+
+
+def random_table(seed, nb_turns=40, nb_identities=60):
+    """
+    :return: (membership table, [set of members] per turn including the live turn)
+    """
+    random = np.random.RandomState(seed)
+    table = MembershipTable()
+    members = set()
+    expected = []
+    for turn in range(0, nb_turns):
+        # Some turns leave the members unchanged, so that their snapshots are shared
+        if random.rand() < 0.7:
+            for idty in random.randint(0, nb_identities, random.randint(1, 6)).tolist():
+                if idty in members:
+                    table.remove(idty)
+                    members.discard(idty)
+                else:
+                    table.add(idty)
+                    members.add(idty)
+        expected.append(set(members))
+        if turn < nb_turns - 1:
+            table.commit()
+    return table, expected
+
+
+def check_turns(table, expected):
+    assert len(table) == len(expected)
+    for (turn, members) in enumerate(expected):
+        assert table[turn].array().tolist() == sorted(members)
+        assert len(table[turn]) == len(members)
+        assert all(idty in table[turn] for idty in members)
+        assert not any(idty in table[turn] for idty in set(range(0, 70)) - members)
+
+
+def test_intervals_round_trip():
+    for seed in range(0, 10):
+        table, expected = random_table(seed)
+        check_turns(table, expected)
+        vertices, starts, stops = table.intervals()
+        check_turns(MembershipTable.from_intervals(vertices, starts, stops, len(table)), expected)
+
+
+def test_intervals_round_trip_memory_mapped(tmp_path):
+    table, expected = random_table(0)
+    vertices, starts, stops = table.intervals()
+    save_arrays(str(tmp_path), {'vertices': vertices, 'starts': starts, 'stops': stops})
+    arrays = load_arrays(str(tmp_path), ['vertices', 'starts', 'stops'])
+    loaded = MembershipTable.from_intervals(arrays['vertices'], arrays['starts'], arrays['stops'], len(table))
+    check_turns(loaded, expected)
+    # Intervals of a loaded table are the saved ones
+    assert [a.tolist() for a in loaded.intervals()] == [vertices.tolist(), starts.tolist(), stops.tolist()]
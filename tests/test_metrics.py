@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("graph_tool")
+
+from wot_stories.history import GraphHistory
+from wot_stories.metrics import MetricsEngine, EXACT, _betweenness
+
+
+def random_edges(nb_vertices, nb_edges, seed):
+    random = np.random.RandomState(seed)
+    sources = random.randint(0, nb_vertices, nb_edges)
+    targets = random.randint(0, nb_vertices, nb_edges)
+    edges = np.unique(np.column_stack((sources, targets))[sources != targets], axis=0)
+    return edges
+
+
+def test_approximate_mean_is_close_to_exact_mean():
+    edges = random_edges(300, 1500, seed=0)
+    exact_vertex, exact_edge = _betweenness((300, edges, None, 0))
+    approximate_vertex, approximate_edge = _betweenness((300, edges, 100, 0))
+
+    assert np.mean(approximate_vertex) == pytest.approx(np.mean(exact_vertex), rel=0.2)
+    assert np.mean(approximate_edge) == pytest.approx(np.mean(exact_edge), rel=0.2)
+
+
+def test_mode_reports_small_turns_computed_exactly():
+    history = GraphHistory()
+    history.add_vertices(5)
+    history.add_edges(np.array([0, 1, 2]), np.array([1, 2, 3]), 0)
+    history.commit()
+    history.add_vertices(45)
+    edges = random_edges(45, 200, seed=1) + 5
+    history.add_edges(edges[:, 0], edges[:, 1], 1)
+
+    metrics = MetricsEngine(history, processes=1, pivots=10)
+    assert metrics.mode([0]) == EXACT
+    assert metrics.mode([1]) == "approximate, 10 pivots"
+    assert metrics.mode() == "approximate, 10 pivots, exact on the smallest turns"
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("graph_tool")
+
+from wot_stories import fast_wot
+from wot_stories.benchmark import PARAMETERS, NB_FOUNDERS, synthetic_story
+
+
+def edges(graph):
+    return sorted(map(tuple, graph.get_edges([graph.ep.time]).tolist()))
+
+
+def test_saved_run_reopens_identical(tmp_path):
+    wot = fast_wot.WoT(keyframe_interval=4, **dict(PARAMETERS, sig_validity=8))
+    wot.initialize(NB_FOUNDERS)
+    loop = asyncio.new_event_loop()
+    for (nb_new, sources, targets) in synthetic_story(200, 30, seed=2):
+        wot.add_identities(nb_new)
+        wot.add_links(sources, targets)
+        loop.run_until_complete(wot.next_turn())
+    loop.close()
+    wot.save(str(tmp_path))
+
+    loaded = fast_wot.WoT.open(str(tmp_path))
+    assert loaded.turn == wot.turn
+    assert len(loaded.wot) == len(wot.wot)
+    for turn in range(0, len(wot.wot)):
+        assert edges(loaded.wot[turn]) == edges(wot.wot[turn])
+        assert loaded.wot[turn].num_vertices() == wot.wot[turn].num_vertices()
+        assert loaded.members[turn].array().tolist() == wot.members[turn].array().tolist()
+        assert list(loaded.identities[turn]) == list(wot.identities[turn])
+    assert loaded.history == wot.history
+    assert loaded.past_links.array().tolist() == wot.past_links.array().tolist()
+    assert loaded.colors == wot.colors
@@ -0,0 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import os
+
+from .reachability import reached_sentries
+
+# Kinds of execution backends for the distance computations
+SERIAL = "serial"
+THREAD = "thread"
+PROCESS = "process"
+
+
+def _chunks(candidates, nb_chunks):
+    size = -(-len(candidates) // nb_chunks)
+    return [candidates[i:i + size] for i in range(0, len(candidates), size)]
+
+
+def _merge(results):
+    counts = []
+    visited = 0
+    for (chunk_counts, chunk_visited) in results:
+        counts.extend(chunk_counts)
+        visited += chunk_visited
+    return counts, visited
+
+
+class SerialBackend:
+    name = SERIAL
+
+    def __init__(self):
+        """
+        Runs the distance computations in the calling thread
+        """
+        self.workers = 1
+
+    def reached_sentries(self, indptr, indices, candidates, sentries, steps_max, needed=None):
+        """
+        Count the sentries from which each candidate can be reached, see reachability.reached_sentries
+        :return: (list of reached sentries counts per candidate, number of visited vertices)
+        """
+        return reached_sentries(indptr, indices, candidates, sentries, steps_max, needed)
+
+    def close(self):
+        pass
+
+
+class ThreadBackend(SerialBackend):
+    name = THREAD
+
+    def __init__(self, workers=None):
+        """
+        Splits the candidates between the threads of a pool.
+        The search is pure Python, so threads only help when the GIL is released.
+        :param workers: Number of threads, defaults to the number of cores
+        """
+        self.workers = workers or os.cpu_count()
+        self.executor = ThreadPoolExecutor(self.workers)
+
+    def reached_sentries(self, indptr, indices, candidates, sentries, steps_max, needed=None):
+        if len(candidates) < 2 * self.workers:
+            return reached_sentries(indptr, indices, candidates, sentries, steps_max, needed)
+        sentries = list(sentries)
+        futures = [self.executor.submit(reached_sentries, indptr, indices, chunk, sentries, steps_max, needed)
+                   for chunk in _chunks(candidates, self.workers)]
+        return _merge(f.result() for f in futures)
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def _shared_reached_sentries(indptr_block, indices_block, nb_vertices, nb_edges, candidates, sentries,
+                             steps_max, needed):
+    indptr_memory = shared_memory.SharedMemory(indptr_block)
+    indices_memory = shared_memory.SharedMemory(indices_block)
+    try:
+        indptr = np.ndarray(nb_vertices + 1, dtype=np.int64, buffer=indptr_memory.buf)
+        indices = np.ndarray(nb_edges, dtype=np.int64, buffer=indices_memory.buf)
+        result = reached_sentries(indptr, indices, candidates, sentries, steps_max, needed)
+        del indptr, indices
+        return result
+    finally:
+        indptr_memory.close()
+        indices_memory.close()
+
+
+class ProcessBackend(SerialBackend):
+    name = PROCESS
+
+    def __init__(self, workers=None):
+        """
+        Splits the candidates between the processes of a pool. The graph adjacency
+        arrays are put once per turn in shared memory, so that the workers do not copy them.
+        :param workers: Number of processes, defaults to the number of cores
+        """
+        self.workers = workers or os.cpu_count()
+        self.executor = ProcessPoolExecutor(self.workers)
+
+    @staticmethod
+    def _share(values):
+        memory = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=np.int64, buffer=memory.buf)[:] = values
+        return memory
+
+    def reached_sentries(self, indptr, indices, candidates, sentries, steps_max, needed=None):
+        if len(candidates) < 2 * self.workers:
+            return reached_sentries(indptr, indices, candidates, sentries, steps_max, needed)
+        sentries = list(sentries)
+        indptr_memory = self._share(np.asarray(indptr, dtype=np.int64))
+        indices_memory = self._share(np.asarray(indices, dtype=np.int64))
+        try:
+            futures = [self.executor.submit(_shared_reached_sentries, indptr_memory.name, indices_memory.name,
+                                            len(indptr) - 1, len(indices), chunk, sentries, steps_max, needed)
+                       for chunk in _chunks(candidates, self.workers)]
+            return _merge(f.result() for f in futures)
+        finally:
+            indptr_memory.close()
+            indptr_memory.unlink()
+            indices_memory.close()
+            indices_memory.unlink()
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def make_backend(kind=SERIAL, workers=None):
+    """
+    :param kind: SERIAL, THREAD or PROCESS
+    :param workers: Number of threads or processes, defaults to the number of cores
+    :return: The execution backend
+    """
+    if kind == SERIAL:
+        return SerialBackend()
+    if kind == THREAD:
+        return ThreadBackend(workers)
+    if kind == PROCESS:
+        return ProcessBackend(workers)
+    raise ValueError("unknown backend {0}".format(kind))
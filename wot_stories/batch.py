@@ -0,0 +1,55 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from .fast_wot import WoT
+
+# Wot opened by each rendering worker
+_wot = None
+
+
+def _open(dest, pivots, error):
+    global _wot
+    _wot = WoT.open(dest)
+    _wot.metrics.set_mode(pivots, error)
+
+
+def _render(task):
+    turn, output = task
+    _wot.render_turn(turn, output)
+    return output
+
+
+def render_turns(dest, turns, outpath, fmt="svg", processes=None, frames=None, pivots=None, error=None):
+    """
+    Draw several turns of a saved Wot in parallel, see WoT.render_turn.
+    The betweenness of the turns is computed first in parallel and the layouts are
+    computed in order, each one seeded by the previous one, so that the frames are stable.
+    Both are saved along the Wot, then each worker opens the saved Wot and only
+    rebuilds the graphs of the turns it draws.
+    :param dest: Directory of the saved Wot
+    :param turns: Turns numbers
+    :param outpath: Prefix of the files paths, the files are named "<outpath>turn <turn>.<fmt>"
+    :param fmt: File format, ie svg or png
+    :param processes: Number of workers, defaults to the number of cores
+    :param frames: Directory of an animation frames sequence named frame_00000.<fmt>, … instead
+                   of the turn files, in the order of turns
+    :param pivots: Number of pivots of an approximate betweenness, see MetricsEngine.set_mode
+    :param error: Maximum error of an approximate betweenness, see MetricsEngine.set_mode
+    :return: List of the written files paths, in the order of turns
+    """
+    turns = list(turns)
+    wot = WoT.open(dest)
+    wot.metrics.processes = processes
+    wot.metrics.set_mode(pivots, error)
+    wot.metrics.compute(sorted(set(turns)))
+    for turn in sorted(set(turns)):
+        wot.layouts['arf'].get(turn, wot.wot[turn])
+
+    if frames:
+        os.makedirs(frames, exist_ok=True)
+        outputs = [os.path.join(frames, "frame_{0:05d}.{1}".format(i, fmt)) for i in range(0, len(turns))]
+    else:
+        outputs = [outpath + "turn {0}.{1}".format(turn, fmt) for turn in turns]
+
+    with ProcessPoolExecutor(processes, initializer=_open, initargs=(dest, pivots, error)) as executor:
+        return list(executor.map(_render, zip(turns, outputs)))
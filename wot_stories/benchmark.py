@@ -0,0 +1,181 @@
+from importlib import import_module
+import subprocess
+import resource
+import asyncio
+import json
+import time
+import sys
+import os
+
+import numpy as np
+
+# Engines compared : name : (module, largest number of identities it is benchmarked with)
+ENGINES = {
+    'wot': ('wot_stories.wot', 10000),
+    'fast_wot': ('wot_stories.fast_wot', 100000),
+    'csr_wot': ('wot_stories.csr_wot', 100000),
+}
+# Protocol parameters of the benchmarked Wots
+PARAMETERS = {'sig_period': 0, 'sig_stock': 100, 'sig_validity': 24, 'sig_qty': 3, 'xpercent': 0.8,
+              'steps_max': 3}
+SIZES = (1000, 10000, 100000)
+NB_TURNS = 50
+NB_FOUNDERS = 6
+
+
+def synthetic_story(nb_identities, nb_turns, seed, sig_qty=PARAMETERS['sig_qty'], churn=0.05):
+    """
+    Seeded synthetic workload : identities arrive at a steady pace until nb_identities,
+    each newcomer is certified by sig_qty + 1 older identities, and every turn a fraction
+    of the older identities issue or renew certifications between them.
+    Identities are numbered in arrival order from 0, the founders being the first ones.
+    :param nb_identities: Number of identities at the end of the story
+    :param nb_turns: Number of turns
+    :param seed: Random seed
+    :param sig_qty: Number of certifications needed to become a member
+    :param churn: Fraction of the identities issuing a certification at each turn
+    :return: [(number of new identities, certifications sources, certifications targets), …] per turn
+    """
+    random = np.random.RandomState(seed)
+    arrivals = np.diff(np.linspace(NB_FOUNDERS, nb_identities, nb_turns + 1).astype(np.int64))
+    existing = NB_FOUNDERS
+    turns = []
+    for nb_new in arrivals.tolist():
+        newcomers = np.repeat(np.arange(existing, existing + nb_new), sig_qty + 1)
+        nb_churn = int(churn * existing) + 1
+        sources = np.concatenate((random.randint(0, existing, len(newcomers)),
+                                  random.randint(0, existing, nb_churn)))
+        targets = np.concatenate((newcomers, random.randint(0, existing, nb_churn)))
+        turns.append((nb_new, sources, targets))
+        existing += nb_new
+    return turns
+
+
+def replay(engine, story):
+    """
+    Replay a story with an engine, using the certification by certification API common to all the engines
+    :param engine: Engine name, see ENGINES
+    :param story: As returned by synthetic_story
+    :return: Dict of the measures
+    """
+    wot = import_module(ENGINES[engine][0]).WoT(**PARAMETERS)
+    loop = asyncio.new_event_loop()
+
+    start = time.perf_counter()
+    founders = list(range(0, NB_FOUNDERS))
+    if engine == 'wot':
+        wot.initialize(founders, [(a, b) for a in founders for b in founders])
+    else:
+        wot.initialize(NB_FOUNDERS)
+    init_time = time.perf_counter() - start
+
+    nb_identities = NB_FOUNDERS
+    start = time.perf_counter()
+    for (nb_new, sources, targets) in story:
+        for idty in range(nb_identities, nb_identities + nb_new):
+            if engine == 'wot':
+                wot.add_identity(idty)
+            else:
+                wot.add_identity()
+        nb_identities += nb_new
+        for (source, target) in zip(sources.tolist(), targets.tolist()):
+            wot.add_link(source, target)
+        result = wot.next_turn()
+        if asyncio.iscoroutine(result):
+            loop.run_until_complete(result)
+    elapsed = time.perf_counter() - start
+    loop.close()
+
+    last = wot.stats.rows[-1] if len(wot.stats) > 0 else {}
+    return {
+        'engine': engine,
+        'identities': nb_identities,
+        'turns': len(story),
+        'init_seconds': init_time,
+        'seconds': elapsed,
+        'turns_per_second': len(story) / elapsed if elapsed > 0 else None,
+        'members': last.get('members'),
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'phases': wot.stats.totals()
+    }
+
+
+def run_one(engine, nb_identities, nb_turns, seed):
+    """
+    Benchmark an engine in a fresh interpreter, so that its peak memory is measured alone
+    :param engine: Engine name, see ENGINES
+    :param nb_identities: Number of identities at the end of the story
+    :param nb_turns: Number of turns
+    :param seed: Random seed of the story
+    :return: Dict of the measures, with an error key if the run failed
+    """
+    command = [sys.executable, '-m', 'wot_stories.benchmark', engine, str(nb_identities), str(nb_turns), str(seed)]
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if process.returncode != 0:
+        return {'engine': engine, 'identities': nb_identities, 'turns': nb_turns,
+                'error': process.stderr.strip().splitlines()[-1:]}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def commit_id():
+    """
+    :return: Short hash of the checked out git commit, "unknown" outside of a git repository
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def benchmark(engines=tuple(ENGINES), sizes=SIZES, nb_turns=NB_TURNS, seed=0, output='benchmarks'):
+    """
+    Run every engine on every story size and save the results as <output>/<commit>.json
+    :param engines: Engines names, see ENGINES
+    :param sizes: Numbers of identities of the stories
+    :param nb_turns: Number of turns of the stories
+    :param seed: Random seed of the stories
+    :param output: Directory of the results
+    :return: The results
+    """
+    results = {'commit': commit_id(), 'seed': seed, 'parameters': PARAMETERS, 'runs': []}
+    for nb_identities in sizes:
+        for engine in engines:
+            if nb_identities > ENGINES[engine][1]:
+                continue
+            run = run_one(engine, nb_identities, nb_turns, seed)
+            results['runs'].append(run)
+            if 'error' in run:
+                print("{0} - {1} identities : failed {2}".format(engine, nb_identities, run['error']))
+            else:
+                print("{0} - {1} identities : {2:.2f} turns/s, {3} MB".format(engine, nb_identities,
+                                                                             run['turns_per_second'],
+                                                                             run['peak_rss_kb'] // 1024))
+
+    os.makedirs(output, exist_ok=True)
+    with open(os.path.join(output, "{0}.json".format(results['commit'])), 'w') as outfile:
+        json.dump(results, outfile, indent=2)
+    return results
+
+
+def compare(before, after):
+    """
+    Compare the throughput of two saved benchmarks
+    :param before: Path of the reference results
+    :param after: Path of the new results
+    :return: [(engine, number of identities, turns/s before, turns/s after), …]
+    """
+    def throughputs(path):
+        with open(path, 'r') as infile:
+            runs = json.load(infile)['runs']
+        return {(r['engine'], r['identities']): r.get('turns_per_second') for r in runs}
+
+    old = throughputs(before)
+    new = throughputs(after)
+    return [(engine, size, old[(engine, size)], new[(engine, size)])
+            for (engine, size) in sorted(new) if (engine, size) in old]
+
+
+if __name__ == '__main__':
+    engine, nb_identities, nb_turns, seed = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4])
+    print(json.dumps(replay(engine, synthetic_story(nb_identities, nb_turns, seed))))
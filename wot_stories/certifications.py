@@ -0,0 +1,151 @@
+from array import array
+import numpy as np
+
+from .storage import column
+
+
+class CertificationLog:
+    def __init__(self, interned=False):
+        """
+        Log of all the certifications issued, in issuing order, as three typed columns :
+        block number, issuer and receiver.
+        Certifications must be appended in block order, which keeps an index of the first
+        certification of each block for range queries. An index by issuer is built on demand.
+        :param interned: True if the public keys are not integers, they are then stored as
+                         numbers given in order of appearance
+        """
+        self.turns = array('q')
+        self.issuers = array('q')
+        self.receivers = array('q')
+        self.starts = []        # Index of the first certification of each block
+        self.keys = [] if interned else None     # Public key of each number
+        self.numbers = {} if interned else None  # { public key : number }
+        self._by_issuer = None  # (order, sorted issuers, turns, receivers) index, built on demand
+
+    def __len__(self):
+        return len(self.turns)
+
+    def __iter__(self):
+        """
+        :return: Iterator on the (block number, issuer, receiver) of the certifications
+        """
+        for (turn, issuer, receiver) in zip(self.turns, self.issuers, self.receivers):
+            yield (int(turn), self.key(issuer), self.key(receiver))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_by_issuer'] = None
+        return state
+
+    def number(self, key):
+        """
+        :param key: Public key
+        :return: Number stored for the public key, given on its first appearance
+        """
+        if self.numbers is None:
+            return key
+        number = self.numbers.get(key)
+        if number is None:
+            number = self.numbers[key] = len(self.keys)
+            self.keys.append(key)
+        return number
+
+    def key(self, number):
+        """
+        :param number: Stored number
+        :return: Public key of the number
+        """
+        number = int(number)
+        return number if self.keys is None else self.keys[number]
+
+    def _index(self, turn):
+        if turn < len(self.starts):
+            raise ValueError("block {0} is before the latest certification".format(turn))
+        while len(self.starts) <= turn:
+            self.starts.append(len(self.turns))
+
+    def append(self, turn, issuer, receiver):
+        """
+        Log a certification
+        :param turn: Block number, not lower than the one of the previous certification
+        :param issuer: Public key of the issuer
+        :param receiver: Public key of the certified individual
+        """
+        if turn + 1 != len(self.starts):
+            self._index(turn)
+        self.turns.append(turn)
+        self.issuers.append(self.number(issuer))
+        self.receivers.append(self.number(receiver))
+
+    def extend(self, turn, issuers, receivers):
+        """
+        Log several certifications of a block at once
+        :param turn: Block number, not lower than the one of the previous certification
+        :param issuers: Array of integer public keys of the issuers
+        :param receivers: Array of integer public keys of the certified individuals
+        """
+        if turn + 1 != len(self.starts):
+            self._index(turn)
+        self.turns.frombytes(np.full(len(issuers), turn, dtype=np.int64).tobytes())
+        self.issuers.frombytes(np.asarray(issuers, dtype=np.int64).tobytes())
+        self.receivers.frombytes(np.asarray(receivers, dtype=np.int64).tobytes())
+
+    def _stop(self, turn):
+        return self.starts[turn + 1] if turn + 1 < len(self.starts) else len(self.turns)
+
+    def between(self, first, last):
+        """
+        Certifications issued from block first to block last, included
+        :param first: First block number
+        :param last: Last block number
+        :return: (block numbers, issuers, receivers) arrays of stored numbers, see key
+        """
+        first = max(first, 0)
+        start = self.starts[first] if first < len(self.starts) else len(self.turns)
+        stop = max(self._stop(last) if last >= 0 else 0, start)
+        return column(self.turns, start=start, stop=stop), column(self.issuers, start=start, stop=stop), \
+            column(self.receivers, start=start, stop=stop)
+
+    def issued_by(self, issuer):
+        """
+        Certifications issued by an identity
+        :param issuer: Public key of the issuer
+        :return: (block numbers, receivers) arrays, receivers as stored numbers, see key
+        """
+        if self._by_issuer is None or len(self._by_issuer[0]) != len(self.turns):
+            columns = self.columns()
+            order = np.argsort(columns['issuers'], kind='stable')
+            self._by_issuer = (order, columns['issuers'][order], columns['turns'], columns['receivers'])
+        order, issuers, turns, receivers = self._by_issuer
+        number = self.numbers.get(issuer, -1) if self.numbers is not None else issuer
+        positions = order[np.searchsorted(issuers, number, 'left'):np.searchsorted(issuers, number, 'right')]
+        return turns[positions], receivers[positions]
+
+    def columns(self):
+        """
+        :return: { 'turns', 'issuers', 'receivers' : numpy array }
+        """
+        return {'turns': column(self.turns), 'issuers': column(self.issuers), 'receivers': column(self.receivers)}
+
+    def array(self):
+        """
+        :return: Array of (block number, issuer, receiver) rows of stored numbers
+        """
+        columns = self.columns()
+        return np.column_stack((columns['turns'], columns['issuers'], columns['receivers']))
+
+    @classmethod
+    def from_array(cls, rows):
+        """
+        Build a read only log from an array of (block number, issuer, receiver) rows, which can be memory-mapped
+        :param rows: Array returned by array()
+        :return: The log
+        """
+        log = cls()
+        rows = np.asarray(rows).reshape(-1, 3)
+        log.turns = rows[:, 0]
+        log.issuers = rows[:, 1]
+        log.receivers = rows[:, 2]
+        nb_turns = int(rows[-1, 0]) + 1 if len(rows) > 0 else 0
+        log.starts = np.searchsorted(rows[:, 0], np.arange(nb_turns), 'left').tolist()
+        return log
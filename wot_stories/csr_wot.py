@@ -0,0 +1,25 @@
+from .edges import EdgeTable
+from .rules import WoTRules
+
+
+class WoT(WoTRules):
+    def __init__(self, sig_period, sig_stock, sig_validity, sig_qty, xpercent, steps_max, backend=None,
+                 events=None):
+        """
+        Wot simulated with numpy arrays only : the certifications are an EdgeTable and
+        the distance rule is checked on its compressed adjacency. It follows the same rules
+        as fast_wot, see WoTRules, without depending on graph_tool.
+        Only the current graph is kept, past turns are described by the members, the identities
+        and the certifications log.
+        :param sig_period:      Minimum time (in number of blocks) that an individual has to wait to issue a new certificate
+        :param sig_stock:       Maximum number of valid certifications that an individual can issue
+        :param sig_validity:    Validity period (in number of blocks) of a certification
+        :param sig_qty:         Number of valid certifications an individual must have to be a member
+        :param xpercent:        Percentage of sentries an individual must reach via in_edges in the Wot to be a member
+        :param steps_max:       Maximum number of hops via in_edges that can be done to reach a sentry
+        :param backend:         Execution backend of the distance computations, see backends.make_backend.
+                                Defaults to a serial backend
+        :param events:          EventSink receiving the simulation events, see events.EVENTS
+        """
+        super().__init__(sig_period, sig_stock, sig_validity, sig_qty, xpercent, steps_max, EdgeTable(),
+                         backend, events)
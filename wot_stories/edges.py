@@ -0,0 +1,131 @@
+import numpy as np
+
+from .reachability import in_adjacency
+
+
+class EdgeTable:
+    def __init__(self):
+        """
+        Directed graph stored as flat edges arrays.
+        Each edge has a slot in the arrays, the slots of removed edges are reused,
+        and the vertices degrees are kept up to date.
+        It has the same interface as the live graph of a GraphHistory, without any history.
+        """
+        self.sources = np.zeros(0, dtype=np.int64)
+        self.targets = np.zeros(0, dtype=np.int64)
+        self.times = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.slots = {}     # { (source, target) : slot }
+        self.free = []      # Slots of removed edges
+        self.in_degrees = np.zeros(0, dtype=np.int64)
+        self.out_degrees = np.zeros(0, dtype=np.int64)
+        self.nb_vertices = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, edge):
+        return edge in self.slots
+
+    def add_vertices(self, nb_vertices):
+        """
+        :param nb_vertices: Number of new vertices
+        :return: Index of the first new vertex
+        """
+        first = self.nb_vertices
+        self.nb_vertices += nb_vertices
+        if self.nb_vertices > len(self.in_degrees):
+            size = max(64, 2 * len(self.in_degrees), self.nb_vertices)
+            self.in_degrees = np.concatenate((self.in_degrees, np.zeros(size - len(self.in_degrees), dtype=np.int64)))
+            self.out_degrees = np.concatenate((self.out_degrees,
+                                               np.zeros(size - len(self.out_degrees), dtype=np.int64)))
+        return first
+
+    def _slot(self):
+        if self.free:
+            return self.free.pop()
+        slot = len(self.slots)
+        if slot >= len(self.alive):
+            size = max(64, 2 * len(self.alive))
+            grow = size - len(self.alive)
+            self.sources = np.concatenate((self.sources, np.zeros(grow, dtype=np.int64)))
+            self.targets = np.concatenate((self.targets, np.zeros(grow, dtype=np.int64)))
+            self.times = np.concatenate((self.times, np.zeros(grow, dtype=np.int64)))
+            self.alive = np.concatenate((self.alive, np.zeros(grow, dtype=bool)))
+        return slot
+
+    def time(self, source, target):
+        """
+        :return: Time of the edge, None if there is no such edge
+        """
+        slot = self.slots.get((source, target))
+        return None if slot is None else int(self.times[slot])
+
+    def in_degree(self, vertex):
+        """
+        :return: In degree of the vertex
+        """
+        return int(self.in_degrees[vertex])
+
+    def add_edge(self, source, target, time):
+        """
+        Add an edge, or renew its time if it already exists
+        :param source: Source vertex index
+        :param target: Target vertex index
+        :param time: Time of the edge
+        :return: True if the edge is new
+        """
+        slot = self.slots.get((source, target))
+        new = slot is None
+        if new:
+            slot = self._slot()
+            self.slots[(source, target)] = slot
+            self.sources[slot] = source
+            self.targets[slot] = target
+            self.alive[slot] = True
+            self.in_degrees[target] += 1
+            self.out_degrees[source] += 1
+        self.times[slot] = time
+        return new
+
+    def add_edges(self, sources, targets, time):
+        """
+        Add several edges which do not exist yet at once
+        :param sources: Array of source vertices indices
+        :param targets: Array of target vertices indices
+        :param time: Time of the edges
+        """
+        for (source, target) in zip(np.asarray(sources).tolist(), np.asarray(targets).tolist()):
+            self.add_edge(source, target, time)
+
+    def remove_edge(self, source, target):
+        """
+        Remove an edge
+        :param source: Source vertex index
+        :param target: Target vertex index
+        """
+        slot = self.slots.pop((source, target))
+        self.alive[slot] = False
+        self.free.append(slot)
+        self.in_degrees[target] -= 1
+        self.out_degrees[source] -= 1
+
+    def edges(self):
+        """
+        :return: (sources, targets) arrays of the existing edges
+        """
+        alive = self.alive
+        return self.sources[alive], self.targets[alive]
+
+    def in_adjacency(self):
+        """
+        :return: (indptr, indices) compressed adjacency of the reversed graph, see reachability.in_adjacency
+        """
+        sources, targets = self.edges()
+        return in_adjacency(sources, targets, self.nb_vertices)
+
+    def commit(self):
+        """
+        Nothing to freeze, only the current graph is kept
+        """
+        pass
@@ -0,0 +1,114 @@
+from collections import Counter
+
+from .issuers import TOO_MANY_CERTIFICATIONS, TOO_RECENT_CERTIFICATION
+
+# Events emitted by the WoT engines, with their arguments
+NEW_TURN = "new_turn"               # (turn)
+IDENTITY_ADDED = "identity_added"   # (idty, turn)
+LINK_ADDED = "link_added"           # (from_idty, to_idty, turn)
+LINK_REJECTED = "link_rejected"     # (from_idty, to_idty, reason)
+LINK_EXPIRED = "link_expired"       # (from_idty, to_idty, turn)
+JOINED = "joined"                   # (idty, turn)
+JOIN_REFUSED = "join_refused"       # (idty, reason, count, needed)
+LEFT = "left"                       # (idty, turn)
+EVENTS = (NEW_TURN, IDENTITY_ADDED, LINK_ADDED, LINK_REJECTED, LINK_EXPIRED, JOINED, JOIN_REFUSED, LEFT)
+
+# Reasons for refusing a certification, besides the issuers ones
+SELF_CERTIFICATION = "self"
+# Reasons for refusing a membership
+NOT_ENOUGH_CERTIFICATIONS = "certifications"
+NOT_ENOUGH_SENTRIES = "sentries"
+
+
+class EventSink:
+    def __init__(self):
+        """
+        Dispatches the events of a WoT to its subscribers.
+        An event without subscriber is dropped before any formatting, so an
+        engine without subscriber only pays a dictionary lookup per event.
+        """
+        self.subscribers = {}   # { event : [callback, …] }
+
+    def subscribe(self, callback, events=EVENTS):
+        """
+        :param callback: Called with (event, *arguments) for each event
+        :param events: Events to listen to, all of them by default
+        """
+        for event in events:
+            self.subscribers.setdefault(event, []).append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        :param callback: A subscribed callback
+        """
+        for event in list(self.subscribers):
+            self.subscribers[event] = [c for c in self.subscribers[event] if c != callback]
+            if not self.subscribers[event]:
+                del self.subscribers[event]
+
+    def wants(self, event):
+        """
+        :param event: Event name
+        :return: True if the event has subscribers
+        """
+        return event in self.subscribers
+
+    def emit(self, event, *args):
+        """
+        Send an event to its subscribers
+        :param event: Event name
+        :param args: Arguments of the event
+        """
+        callbacks = self.subscribers.get(event)
+        if callbacks:
+            for callback in callbacks:
+                callback(event, *args)
+
+
+class CounterSubscriber:
+    def __init__(self):
+        """
+        Only counts the events, and the refusals by reason
+        """
+        self.counts = Counter()     # { event : number }
+        self.reasons = Counter()    # { (event, reason) : number }
+
+    def __call__(self, event, *args):
+        self.counts[event] += 1
+        if event == LINK_REJECTED:
+            self.reasons[(event, args[2])] += 1
+        elif event == JOIN_REFUSED:
+            self.reasons[(event, args[1])] += 1
+
+
+MESSAGES = {
+    NEW_TURN: "== New turn {0} ==",
+    IDENTITY_ADDED: "{0} : New identity in the wot",
+    LINK_ADDED: "{0} -> {1} : Adding certification",
+    LINK_EXPIRED: "{0} -> {1} : Link expired ({2})",
+    JOINED: "{0} : Joined community",
+    LEFT: "{0} : Left community",
+    (LINK_REJECTED, SELF_CERTIFICATION): "{0} -> {1} : Error : link on self",
+    (LINK_REJECTED, TOO_MANY_CERTIFICATIONS): "{0} -> {1} : Too much certifications issued",
+    (LINK_REJECTED, TOO_RECENT_CERTIFICATION): "{0} -> {1} : Latest certification is too recent",
+    (JOIN_REFUSED, NOT_ENOUGH_CERTIFICATIONS): "{0} : Cannot join : not enough certifications ({2}/{3})",
+    (JOIN_REFUSED, NOT_ENOUGH_SENTRIES): "{0} : Cannot join : not enough sentries ({2}/{3})",
+}
+
+
+class PrintSubscriber:
+    def __init__(self, output=print):
+        """
+        Writes a readable line for each event
+        :param output: Function called with each line, ie print or logging.debug
+        """
+        self.output = output
+
+    def __call__(self, event, *args):
+        if event == LINK_REJECTED:
+            message = MESSAGES[(event, args[2])]
+        elif event == JOIN_REFUSED:
+            message = MESSAGES[(event, args[1])]
+        else:
+            message = MESSAGES[event]
+        self.output(message.format(*args))
@@ -0,0 +1,298 @@
+from graph_tool import Graph
+from array import array
+from collections import OrderedDict
+import numpy as np
+
+from .reachability import in_adjacency
+from .storage import column
+
+# Kinds of changes recorded in a turn delta
+ADD_VERTEX = 0
+ADD_EDGE = 1
+REMOVE_EDGE = 2
+
+# Rough memory footprint of a graph_tool graph, used to cap the cache size
+VERTEX_BYTES = 64
+EDGE_BYTES = 48
+
+
+class GraphHistory:
+    def __init__(self, keyframe_interval=20, cache_size=8, cache_bytes=None):
+        """
+        Turn by turn history of the Wot graph.
+        Only the live graph (the turn being built) is fully kept in memory. Each turn
+        is stored as the list of changes applied to the live graph during this turn,
+        and a full copy of the graph is kept every keyframe_interval turns.
+        Past turns are rebuilt on demand from the nearest keyframe or cached turn,
+        and the most recently used ones are kept in a LRU cache.
+        :param keyframe_interval:   Number of turns between two full copies of the graph
+        :param cache_size:          Maximum number of rebuilt turns kept in memory
+        :param cache_bytes:         Approximate maximum memory used by the rebuilt turns, None for no limit
+        """
+        self.keyframe_interval = keyframe_interval
+        self.cache_size = cache_size
+        self.cache_bytes = cache_bytes
+
+        self._live = Graph(directed=True)
+        self._live.ep.time = self._live.new_edge_property("int")
+
+        # Changes log, one entry per change : (kind, source, target, time)
+        self.kinds = array('b')
+        self.sources = array('q')
+        self.targets = array('q')
+        self.times = array('q')
+        # Index in the changes log of the first change of each turn
+        self.offsets = [0]
+
+        self.keyframes = {}     # { turn : Graph }
+        self._cache = OrderedDict()     # { turn : Graph } rebuilt turns, least recently used first
+
+    @property
+    def live(self):
+        """
+        The graph of the turn being built
+        """
+        if self._live is None:
+            self._live = self._build(len(self) - 1)
+        return self._live
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, turn):
+        """
+        Get the graph of a turn. The last turn is the live graph, other turns
+        are rebuilt copies and must be considered as read only.
+        :param turn: Turn number
+        :return: The graph of the turn
+        """
+        if turn < 0:
+            turn += len(self)
+        if not 0 <= turn < len(self):
+            raise IndexError("turn {0} out of history".format(turn))
+
+        if turn == len(self) - 1:
+            return self.live
+
+        if turn in self._cache:
+            self._cache.move_to_end(turn)
+            return self._cache[turn]
+
+        # Start from the closest earlier turn available
+        start = max((t for t in self._cache if t < turn), default=None)
+        keyframe = turn - turn % self.keyframe_interval
+        if keyframe in self.keyframes and (start is None or start < keyframe):
+            start, base = keyframe, self.keyframes[keyframe]
+        elif start is not None and (keyframe in self.keyframes or
+                                    self.offsets[turn + 1] - self.offsets[start + 1] < self._cache[start].num_edges()):
+            base = self._cache[start]
+        else:
+            base = None
+
+        if base is None:
+            graph = self._build(turn)
+        else:
+            graph = base.copy()
+            self._replay(graph, self.offsets[start + 1], self.offsets[turn + 1])
+
+        self._cache[turn] = graph
+        self._evict()
+        return graph
+
+    def _evict(self):
+        """
+        Drop the least recently used turns above the cache limits
+        """
+        while len(self._cache) > max(self.cache_size, 1):
+            self._cache.popitem(last=False)
+        if self.cache_bytes is not None:
+            size = sum(g.num_vertices() * VERTEX_BYTES + g.num_edges() * EDGE_BYTES for g in self._cache.values())
+            while len(self._cache) > 1 and size > self.cache_bytes:
+                turn, graph = self._cache.popitem(last=False)
+                size -= graph.num_vertices() * VERTEX_BYTES + graph.num_edges() * EDGE_BYTES
+
+    def __iter__(self):
+        for turn in range(0, len(self)):
+            yield self[turn]
+
+    def _record(self, kind, source, target, time):
+        self.kinds.append(kind)
+        self.sources.append(source)
+        self.targets.append(target)
+        self.times.append(time)
+
+    def _record_many(self, kind, sources, targets, time):
+        nb_changes = len(sources)
+        self.kinds.frombytes(np.full(nb_changes, kind, dtype=np.int8).tobytes())
+        self.sources.frombytes(np.asarray(sources, dtype=np.int64).tobytes())
+        self.targets.frombytes(np.broadcast_to(np.asarray(targets, dtype=np.int64), (nb_changes,)).tobytes())
+        self.times.frombytes(np.full(nb_changes, time, dtype=np.int64).tobytes())
+
+    def _replay(self, graph, start, stop):
+        """
+        Apply a slice of the changes log to a graph
+        """
+        for i in range(start, stop):
+            kind = self.kinds[i]
+            source, target = int(self.sources[i]), int(self.targets[i])
+            if kind == ADD_VERTEX:
+                graph.add_vertex()
+            elif kind == ADD_EDGE:
+                edge = graph.edge(source, target)
+                if not edge:
+                    edge = graph.add_edge(source, target)
+                graph.ep.time[edge] = int(self.times[i])
+            else:
+                graph.remove_edge(graph.edge(source, target))
+
+    def _build(self, turn):
+        """
+        Build the graph of a turn from scratch : an edge exists if the latest
+        change on it up to this turn is an addition
+        """
+        columns = self.columns()
+        stop = columns['offsets'][turn + 1] if turn + 1 < len(self) else len(columns['kinds'])
+        kinds = np.asarray(columns['kinds'][:stop])
+        sources = np.asarray(columns['sources'][:stop])
+        targets = np.asarray(columns['targets'][:stop])
+        times = np.asarray(columns['times'][:stop])
+
+        graph = Graph(directed=True)
+        graph.ep.time = graph.new_edge_property("int")
+        nb_vertices = int(np.count_nonzero(kinds == ADD_VERTEX))
+        if nb_vertices > 0:
+            graph.add_vertex(nb_vertices)
+
+        changes = np.flatnonzero(kinds != ADD_VERTEX)
+        keys = sources[changes] * nb_vertices + targets[changes]
+        # Index of the latest change of each edge
+        unique_keys, reversed_index = np.unique(keys[::-1], return_index=True)
+        latest = np.sort(changes[len(changes) - 1 - reversed_index])
+        latest = latest[kinds[latest] == ADD_EDGE]
+        graph.add_edge_list(np.column_stack((sources[latest], targets[latest], times[latest])),
+                            eprops=[graph.ep.time])
+        return graph
+
+    def add_vertices(self, nb_vertices):
+        """
+        Add several vertices to the live graph at once
+        :param nb_vertices: Number of vertices
+        :return: Index of the first new vertex
+        """
+        first = self.live.num_vertices()
+        if nb_vertices > 0:
+            self.live.add_vertex(nb_vertices)
+            self._record_many(ADD_VERTEX, np.arange(first, first + nb_vertices), -1, -1)
+        return first
+
+    def add_edge(self, source, target, time):
+        """
+        Add an edge to the live graph, or renew its time if it already exists
+        :param source: Source vertex index
+        :param target: Target vertex index
+        :param time: Time of the edge
+        :return: The edge
+        """
+        edge = self.live.edge(source, target)
+        if not edge:
+            edge = self.live.add_edge(source, target)
+        self.live.ep.time[edge] = time
+        self._record(ADD_EDGE, source, target, time)
+        return edge
+
+    def add_edges(self, sources, targets, time):
+        """
+        Add several edges which do not exist yet to the live graph at once
+        :param sources: Array of source vertices indices
+        :param targets: Array of target vertices indices
+        :param time: Time of the edges
+        """
+        if len(sources) > 0:
+            self.live.add_edge_list(np.column_stack((sources, targets, np.full(len(sources), time))),
+                                    eprops=[self.live.ep.time])
+            self._record_many(ADD_EDGE, sources, targets, time)
+
+    def remove_edge(self, source, target):
+        """
+        Remove an edge from the live graph
+        :param source: Source vertex index
+        :param target: Target vertex index
+        """
+        self.live.remove_edge(self.live.edge(source, target))
+        self._record(REMOVE_EDGE, source, target, -1)
+
+    @property
+    def nb_vertices(self):
+        """
+        Number of vertices of the live graph
+        """
+        return self.live.num_vertices()
+
+    def time(self, source, target):
+        """
+        :return: Time of the edge in the live graph, None if there is no such edge
+        """
+        edge = self.live.edge(source, target)
+        return int(self.live.ep.time[edge]) if edge else None
+
+    def in_degree(self, vertex):
+        """
+        :return: In degree of the vertex in the live graph
+        """
+        return self.live.vertex(vertex).in_degree()
+
+    def edges(self):
+        """
+        :return: (sources, targets) arrays of the edges of the live graph
+        """
+        edges = self.live.get_edges().astype(np.int64)
+        return edges[:, 0], edges[:, 1]
+
+    def in_adjacency(self):
+        """
+        :return: (indptr, indices) compressed adjacency of the reversed live graph, see reachability.in_adjacency
+        """
+        sources, targets = self.edges()
+        return in_adjacency(sources, targets, self.nb_vertices)
+
+    def commit(self):
+        """
+        Freeze the live graph as the current turn and start a new turn
+        """
+        turn = len(self) - 1
+        if turn % self.keyframe_interval == 0:
+            self.keyframes[turn] = self.live.copy()
+        self.offsets.append(len(self.kinds))
+
+    def columns(self):
+        """
+        The changes log as flat arrays
+        :return: { name : numpy array } with kinds, sources, targets, times and turn offsets
+        """
+        return {
+            'kinds': column(self.kinds, np.int8),
+            'sources': column(self.sources, np.int64),
+            'targets': column(self.targets, np.int64),
+            'times': column(self.times, np.int64),
+            'offsets': np.array(self.offsets, dtype=np.int64)
+        }
+
+    @classmethod
+    def from_columns(cls, columns, keyframe_interval=20, cache_size=8, cache_bytes=None):
+        """
+        Build a read only history from the arrays returned by columns(), which can be memory-mapped.
+        Turns are only rebuilt when they are accessed.
+        :param columns: { name : numpy array }
+        :param keyframe_interval: Number of turns between two full copies of the graph
+        :param cache_size: Maximum number of rebuilt turns kept in memory
+        :param cache_bytes: Approximate maximum memory used by the rebuilt turns, None for no limit
+        :return: The history
+        """
+        history = cls(keyframe_interval, cache_size, cache_bytes)
+        history._live = None
+        history.kinds = columns['kinds']
+        history.sources = columns['sources']
+        history.targets = columns['targets']
+        history.times = columns['times']
+        history.offsets = columns['offsets'].tolist()
+        return history
@@ -0,0 +1,103 @@
+import numpy as np
+
+# Reasons for refusing a certification to an issuer
+TOO_MANY_CERTIFICATIONS = "stock"
+TOO_RECENT_CERTIFICATION = "period"
+
+
+class IssuerTable:
+    def __init__(self):
+        """
+        Certification state of each issuer : number of valid certifications
+        it has issued and block number of its latest certification
+        """
+        self.counts = {}
+        self.latest = {}
+
+    def count(self, idty):
+        """
+        :param idty: Public key of the issuer
+        :return: Number of valid certifications issued
+        """
+        return self.counts.get(idty, 0)
+
+    def check(self, idty, turn, sig_stock, sig_period):
+        """
+        Checks if an issuer can issue a new certification
+        :param idty: Public key of the issuer
+        :param turn: Current block number
+        :param sig_stock: Maximum number of valid certifications that an individual can issue
+        :param sig_period: Minimum time that an individual has to wait to issue a new certificate
+        :return: None if the certification can be issued, else the reason of the refusal
+        """
+        count = self.count(idty)
+        # Checks the issuer signatures "stock"
+        if count >= sig_stock:
+            return TOO_MANY_CERTIFICATIONS
+        # Checks if the issuer has waited enough time since his last certificate before emit a new one
+        if count > 0 and self.latest[idty] + sig_period > turn:
+            return TOO_RECENT_CERTIFICATION
+        return None
+
+    def issued(self, idty, turn, new):
+        """
+        Records a certification issued
+        :param idty: Public key of the issuer
+        :param turn: Block number of the certification
+        :param new: False if the certification renews an existing one
+        """
+        if new:
+            self.counts[idty] = self.count(idty) + 1
+        self.latest[idty] = turn
+
+    def expired(self, idty):
+        """
+        Records the expiration of a certification
+        :param idty: Public key of the issuer
+        """
+        self.counts[idty] -= 1
+
+
+class ArrayIssuerTable(IssuerTable):
+    def __init__(self):
+        """
+        Issuer table for identities numbered from 0, backed by arrays
+        """
+        self.counts = np.zeros(0, dtype=np.int32)
+        self.latest = np.zeros(0, dtype=np.int64)
+
+    def _grow(self, idty):
+        if idty >= len(self.counts):
+            size = max(64, 2 * len(self.counts), idty + 1)
+            self.counts = np.concatenate((self.counts, np.zeros(size - len(self.counts), dtype=np.int32)))
+            self.latest = np.concatenate((self.latest, np.zeros(size - len(self.latest), dtype=np.int64)))
+
+    def count(self, idty):
+        return int(self.counts[idty]) if idty < len(self.counts) else 0
+
+    def issued(self, idty, turn, new):
+        self._grow(idty)
+        if new:
+            self.counts[idty] += 1
+        self.latest[idty] = turn
+
+    def state(self, idties):
+        """
+        :param idties: Array of public keys of issuers
+        :return: (numbers of valid certifications issued, block numbers of the latest ones) arrays
+        """
+        if len(idties) > 0:
+            self._grow(int(np.max(idties)))
+        return self.counts[idties], self.latest[idties]
+
+    def issued_many(self, idties, turn, new):
+        """
+        Records several certifications issued during a turn
+        :param idties: Array of public keys of issuers, which can be repeated
+        :param turn: Block number of the certifications
+        :param new: Boolean array, False for certifications renewing an existing one
+        """
+        if len(idties) > 0:
+            self._grow(int(np.max(idties)))
+            np.add.at(self.counts, idties[new], 1)
+            self.latest[idties] = turn
@@ -0,0 +1,109 @@
+from graph_tool.draw import arf_layout, sfdp_layout
+import numpy as np
+import os
+
+from .storage import save_arrays, load_arrays
+from .metrics import graph_arrays, content_hash
+
+# Layout algorithms
+LAYOUTS = {'arf': arf_layout, 'sfdp': sfdp_layout}
+
+
+class LayoutCache:
+    def __init__(self, layout='arf', refine_iter=20, directory=None, **options):
+        """
+        Positions of the vertices of each turn.
+        The first layout is computed from scratch, the next ones start from the positions
+        of the closest turn already laid out and only run a few iterations, so that
+        consecutive turns look alike and are cheap to lay out.
+        Positions are keyed by turn and graph content, so that the positions saved for
+        another graph, ie by a previous run saved in the same directory, are never reused.
+        :param layout: Layout algorithm, see LAYOUTS
+        :param refine_iter: Number of iterations of a layout started from known positions
+        :param directory: Directory where the positions are saved, None to keep them in memory only
+        :param options: Options of the layout algorithm, ie d=10 for arf
+        """
+        self.layout = layout
+        self.refine_iter = refine_iter
+        self.directory = directory
+        self.options = options
+        self.positions = {}     # { turn : array of (x, y) per vertex }
+        self.hashes = {}        # { turn : content hash of the graph laid out }
+
+    def _name(self, turn, key):
+        return "{0}_{1}_{2}".format(self.layout, turn, key)
+
+    def _load(self, turn, key):
+        name = self._name(turn, key)
+        if self.directory and os.path.exists(os.path.join(self.directory, name + ".npy")):
+            self.positions[turn] = load_arrays(self.directory, [name], mmap_mode=None)[name]
+            self.hashes[turn] = key
+            return self.positions[turn]
+        return None
+
+    def _seed(self, turn):
+        """
+        :return: Positions of the closest turn laid out, earlier turns first, None if there is none
+        """
+        if self.positions:
+            return self.positions[min(self.positions, key=lambda t: (abs(t - turn), t > turn))]
+        return None
+
+    def __getitem__(self, turn):
+        """
+        :param turn: Turn number
+        :return: Array of the (x, y) positions of the vertices, None if the turn is not laid out
+        """
+        return self.positions.get(turn)
+
+    def get(self, turn, graph):
+        """
+        Positions of the vertices of a turn, computed if needed
+        :param turn: Turn number
+        :param graph: Graph of the turn
+        :return: Vertex property map of the positions, as expected by graph_draw
+        """
+        nb_vertices, edges, _ = graph_arrays(graph)
+        key = content_hash(nb_vertices, edges)
+        positions = self.positions.get(turn) if self.hashes.get(turn) == key else self._load(turn, key)
+        if positions is not None:
+            pos = graph.new_vertex_property("vector<double>")
+            pos.set_2d_array(np.asarray(positions).T.copy())
+            return pos
+
+        seed = self._seed(turn)
+        if seed is None:
+            pos = LAYOUTS[self.layout](graph, **self.options)
+        else:
+            pos = LAYOUTS[self.layout](graph, pos=self._seeded(graph, seed), max_iter=self.refine_iter,
+                                       **self.options)
+        self.positions[turn] = pos.get_2d_array([0, 1]).T.copy()
+        self.hashes[turn] = key
+        if self.directory:
+            save_arrays(self.directory, {self._name(turn, key): self.positions[turn]})
+        return pos
+
+    @staticmethod
+    def _seeded(graph, seed):
+        """
+        Initial positions of a graph from the positions of another turn. Vertices are never
+        removed from the Wot, so they keep their index : the known vertices keep their position,
+        and the new ones start at the centroid of their known neighbours.
+        """
+        nb_vertices = graph.num_vertices()
+        known = min(len(seed), nb_vertices)
+        positions = np.empty((nb_vertices, 2))
+        positions[:known] = seed[:known]
+        if known < nb_vertices:
+            centroid = positions[:known].mean(axis=0) if known > 0 else np.zeros(2)
+            spread = positions[:known].std(axis=0) + 1 if known > 0 else np.ones(2)
+            for v in range(known, nb_vertices):
+                neighbours = [int(u) for u in graph.vertex(v).all_neighbors() if int(u) < known]
+                if neighbours:
+                    positions[v] = positions[neighbours].mean(axis=0)
+                else:
+                    positions[v] = centroid
+                positions[v] += np.random.normal(0, 0.1, 2) * spread
+        pos = graph.new_vertex_property("vector<double>")
+        pos.set_2d_array(positions.T.copy())
+        return pos
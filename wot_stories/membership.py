@@ -0,0 +1,218 @@
+import numpy as np
+
+
+class Members:
+    def __init__(self, table, turn):
+        """
+        Read only view on the members of a turn
+        :param table: The MembershipTable
+        :param turn: Turn number
+        """
+        self.table = table
+        self.turn = turn
+
+    def _is_live(self):
+        return self.turn == len(self.table.snapshots)
+
+    def __contains__(self, idty):
+        idty = int(idty)
+        if self._is_live():
+            mask = self.table.mask
+            return 0 <= idty < len(mask) and bool(mask[idty])
+        bits = self.table.snapshot(self.turn)[0]
+        byte = idty >> 3
+        return 0 <= byte < len(bits) and bool((bits[byte] >> (7 - (idty & 7))) & 1)
+
+    def __len__(self):
+        if self._is_live():
+            return self.table.size
+        return self.table.snapshot(self.turn)[1]
+
+    def __iter__(self):
+        return iter(self.array().tolist())
+
+    def array(self):
+        """
+        :return: Numpy array of the members public keys
+        """
+        if self._is_live():
+            return np.flatnonzero(self.table.mask)
+        return np.flatnonzero(np.unpackbits(self.table.snapshot(self.turn)[0]))
+
+
+class MembershipTable:
+    def __init__(self):
+        """
+        Members of the Wot at each turn.
+        The live turn is a boolean mask indexed by public key, committed turns
+        are packed bitsets shared between consecutive turns while they are unchanged.
+        """
+        self.mask = np.zeros(0, dtype=bool)
+        self.size = 0
+        self.snapshots = []     # [(packed bits, number of members), …] per committed turn
+        self.periods = None     # (vertices, starts, stops) when loaded from membership periods
+        self._changed = True
+
+    def __len__(self):
+        return len(self.snapshots) + 1
+
+    def __getitem__(self, turn):
+        if turn < 0:
+            turn += len(self)
+        if not 0 <= turn < len(self):
+            raise IndexError("turn {0} out of membership table".format(turn))
+        return Members(self, turn)
+
+    def __iter__(self):
+        for turn in range(0, len(self)):
+            yield Members(self, turn)
+
+    def snapshot(self, turn):
+        """
+        :param turn: Committed turn number
+        :return: (packed bits, number of members) of the turn
+        """
+        snapshot = self.snapshots[turn]
+        if snapshot is None:
+            vertices, starts, stops = self.periods
+            members = np.asarray(vertices[(starts <= turn) & (turn < stops)])
+            mask = np.zeros(members.max() + 1 if len(members) > 0 else 0, dtype=bool)
+            mask[members] = True
+            snapshot = (np.packbits(mask), len(members))
+            self.snapshots[turn] = snapshot
+        return snapshot
+
+    def add(self, idty):
+        """
+        Add a member to the live turn
+        :param idty: Public key of the new member
+        """
+        if idty >= len(self.mask):
+            mask = np.zeros(max(64, 2 * len(self.mask), idty + 1), dtype=bool)
+            mask[:len(self.mask)] = self.mask
+            self.mask = mask
+        if not self.mask[idty]:
+            self.mask[idty] = True
+            self.size += 1
+            self._changed = True
+
+    def remove(self, idty):
+        """
+        Remove a member from the live turn
+        :param idty: Public key of the member
+        """
+        if not 0 <= idty < len(self.mask) or not self.mask[idty]:
+            raise ValueError("{0} is not a member".format(idty))
+        self.mask[idty] = False
+        self.size -= 1
+        self._changed = True
+
+    def commit(self):
+        """
+        Freeze the members of the live turn and start a new turn
+        """
+        if self._changed or not self.snapshots:
+            members = np.flatnonzero(self.mask)
+            extent = members[-1] + 1 if len(members) > 0 else 0
+            bits = np.packbits(self.mask[:extent])
+            bits.flags.writeable = False
+        else:
+            bits = self.snapshots[-1][0]
+        self.snapshots.append((bits, self.size))
+        self._changed = False
+
+    def intervals(self):
+        """
+        Membership periods : each vertex was a member from turn start (included)
+        to turn stop (excluded), stop being len(self) if it still is a member
+        :return: (vertices, starts, stops) numpy arrays, sorted by vertex then start
+        """
+        if self.periods is not None:
+            return self.periods
+
+        size = len(self.mask)
+        previous = np.zeros(size, dtype=bool)
+        previous_bits = None
+        joins = []      # [(vertices, turn), …]
+        leaves = []
+        for turn in range(0, len(self)):
+            if turn < len(self.snapshots):
+                bits = self.snapshot(turn)[0]
+                if bits is previous_bits:
+                    continue
+                previous_bits = bits
+                current = np.zeros(size, dtype=bool)
+                unpacked = np.unpackbits(bits).astype(bool)[:size]
+                current[:len(unpacked)] = unpacked
+            else:
+                current = self.mask
+            joins.append((np.flatnonzero(current & ~previous), turn))
+            leaves.append((np.flatnonzero(previous & ~current), turn))
+            previous = current
+        leaves.append((np.flatnonzero(previous), len(self)))
+
+        def flatten(changes):
+            vertices = np.concatenate([v for (v, t) in changes] + [np.zeros(0, dtype=np.int64)])
+            turns = np.concatenate([np.full(len(v), t, dtype=np.int64) for (v, t) in changes]
+                                   + [np.zeros(0, dtype=np.int64)])
+            order = np.lexsort((turns, vertices))
+            return vertices[order], turns[order]
+
+        vertices, starts = flatten(joins)
+        _, stops = flatten(leaves)
+        return vertices, starts, stops
+
+    @classmethod
+    def from_intervals(cls, vertices, starts, stops, nb_turns):
+        """
+        Build a read only membership table from membership periods, which can be memory-mapped.
+        Turns are only unpacked when they are accessed.
+        :param vertices: Array of members
+        :param starts: Array of first turns as member
+        :param stops: Array of first turns not member anymore
+        :param nb_turns: Number of turns, including the live turn
+        :return: The membership table
+        """
+        table = cls()
+        table.periods = (vertices, starts, stops)
+        table.snapshots = [None] * (nb_turns - 1)
+        live = nb_turns - 1
+        for idty in np.asarray(vertices[(starts <= live) & (live < stops)]).tolist():
+            table.add(idty)
+        table._changed = False
+        return table
+
+
+class IdentityTable:
+    def __init__(self):
+        """
+        Identities of the Wot at each turn.
+        Identities are numbered contiguously from 0 and are never removed, so a
+        turn is fully described by its number of identities.
+        """
+        self.counts = [0]   # Number of identities at each turn, last one is the live turn
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __getitem__(self, turn):
+        return range(self.counts[turn])
+
+    def __iter__(self):
+        for count in self.counts:
+            yield range(count)
+
+    def add(self, idty):
+        """
+        Add an identity to the live turn
+        :param idty: Public key of the new identity, must be the next free number
+        """
+        if idty != self.counts[-1]:
+            raise ValueError("{0} is not the next identity ({1})".format(idty, self.counts[-1]))
+        self.counts[-1] += 1
+
+    def commit(self):
+        """
+        Freeze the identities of the live turn and start a new turn
+        """
+        self.counts.append(self.counts[-1])
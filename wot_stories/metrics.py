@@ -0,0 +1,218 @@
+from concurrent.futures import ProcessPoolExecutor
+from graph_tool import Graph
+from graph_tool.centrality import betweenness
+import numpy as np
+import hashlib
+import math
+import os
+
+from .storage import save_arrays, load_arrays
+
+# Betweenness modes
+EXACT = "exact"
+APPROXIMATE = "approximate"
+
+
+def graph_arrays(graph):
+    """
+    Canonical description of a graph, independent of the order its edges were added in
+    :param graph: A graph_tool graph
+    :return: (number of vertices, edges array sorted by source then target, edges indices in the graph)
+    """
+    edges = graph.get_edges([graph.edge_index])
+    edges = edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+    return graph.num_vertices(), edges[:, :2], edges[:, 2]
+
+
+def content_hash(nb_vertices, edges):
+    """
+    :param nb_vertices: Number of vertices
+    :param edges: Sorted edges array, as returned by graph_arrays
+    :return: Hexadecimal digest of the graph content
+    """
+    digest = hashlib.sha1(str(nb_vertices).encode())
+    digest.update(np.ascontiguousarray(edges, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def pivots_for_error(nb_vertices, error, confidence=0.9):
+    """
+    Number of pivots needed so that every normalized betweenness estimate is within error
+    of the exact value with the given confidence (Hoeffding bound over all the vertices)
+    :param nb_vertices: Number of vertices
+    :param error: Maximum absolute error on the normalized betweenness
+    :param confidence: Probability that all the estimates are within the error
+    :return: Number of pivots
+    """
+    return int(math.ceil(math.log(2 * max(nb_vertices, 1) / (1 - confidence)) / (2 * error ** 2)))
+
+
+def _betweenness(task):
+    """
+    Betweenness of a graph given as arrays, run in the workers, normalized by graph_tool.
+    With pivots, only the shortest paths starting from a random sample of vertices are
+    counted, and graph_tool normalizes them by the number of pivots instead of the number
+    of vertices : the result is an unbiased estimate of the exact normalized betweenness.
+    :param task: (number of vertices, sorted edges array, number of pivots or None for the exact value, seed)
+    :return: (vertices betweenness array, edges betweenness array in the order of the edges)
+    """
+    nb_vertices, edges, nb_pivots, seed = task
+    graph = Graph(directed=True)
+    graph.add_vertex(nb_vertices)
+    graph.add_edge_list(edges)
+    if nb_pivots is None or nb_pivots >= nb_vertices:
+        vertex, edge = betweenness(graph)
+        return vertex.get_array().copy(), edge.get_array()[:len(edges)].copy()
+
+    pivots = np.random.RandomState(seed).choice(nb_vertices, nb_pivots, replace=False)
+    vertex, edge = betweenness(graph, pivots=pivots)
+    return vertex.get_array().copy(), edge.get_array()[:len(edges)].copy()
+
+
+class MetricsEngine:
+    def __init__(self, history, directory=None, processes=None, pivots=None, error=None, seed=0):
+        """
+        Graph metrics of each turn, computed at most once.
+        Results are cached by turn, graph content and betweenness mode, in memory and optionally on disk.
+        :param history: GraphHistory of the Wot
+        :param directory: Directory where the results are saved, None to keep them in memory only
+        :param processes: Number of workers computing the turns in parallel, defaults to the number of cores
+        :param pivots: Number of pivots of the approximate betweenness, see set_mode
+        :param error: Maximum error of the approximate betweenness, see set_mode
+        :param seed: Random seed of the pivots sampling
+        """
+        self.history = history
+        self.directory = directory
+        self.processes = processes
+        self.seed = seed
+        self.cache = {}     # { (turn, content hash, mode) : (vertices betweenness, edges betweenness) }
+        self.modes = {}     # { turn : mode of its cache key } for the turns computed with the current mode
+        self.set_mode(pivots, error)
+
+    def set_mode(self, pivots=None, error=None):
+        """
+        Choose between the exact betweenness, the default, and an estimate computed from a
+        sample of pivots, given either as a number of pivots or as a maximum error
+        :param pivots: Number of pivots
+        :param error: Maximum absolute error on the normalized betweenness, see pivots_for_error
+        """
+        if pivots is not None and error is not None:
+            raise ValueError("pivots and error cannot be both set")
+        self.pivots = pivots
+        self.error = error
+        self.modes = {}
+
+    def _pivots(self, nb_vertices):
+        if self.pivots is not None:
+            return self.pivots if self.pivots < nb_vertices else None
+        if self.error is not None:
+            pivots = pivots_for_error(nb_vertices, self.error)
+            return pivots if pivots < nb_vertices else None
+        return None
+
+    def mode(self, turns=None):
+        """
+        Description of the betweenness mode, to be written in the reports.
+        The turns with no more vertices than the pivots needed are computed exactly whatever the mode.
+        :param turns: Turns numbers the description applies to, all the turns by default
+        :return: Description of the way the betweenness of the turns was computed
+        """
+        turns = range(0, len(self.history)) if turns is None else turns
+        missing = [turn for turn in turns if turn not in self.modes]
+        if missing:
+            self.compute(missing)
+        modes = {self.modes[turn] for turn in turns}
+        if modes <= {EXACT}:
+            return EXACT
+        if self.pivots is not None:
+            description = "{0}, {1} pivots".format(APPROXIMATE, self.pivots)
+        else:
+            description = "{0}, error {1}".format(APPROXIMATE, self.error)
+        if EXACT in modes:
+            description += ", exact on the smallest turns"
+        return description
+
+    def _name(self, key):
+        return "betweenness_{0}_{1}_{2}".format(*key)
+
+    def _lookup(self, key):
+        if key in self.cache:
+            return self.cache[key]
+        if self.directory and os.path.exists(os.path.join(self.directory, self._name(key) + "_vertex.npy")):
+            arrays = load_arrays(self.directory, [self._name(key) + "_vertex", self._name(key) + "_edge"])
+            self.cache[key] = (arrays[self._name(key) + "_vertex"], arrays[self._name(key) + "_edge"])
+            return self.cache[key]
+        return None
+
+    def _store(self, key, result):
+        self.cache[key] = result
+        if self.directory:
+            save_arrays(self.directory, {self._name(key) + "_vertex": result[0],
+                                         self._name(key) + "_edge": result[1]})
+
+    def compute(self, turns=None):
+        """
+        Compute the betweenness of the turns not cached yet, in parallel
+        :param turns: Turns numbers, all the turns by default
+        :return: { turn : (cache key, edges indices in the graph of the turn) }
+        """
+        turns = range(0, len(self.history)) if turns is None else turns
+        keys = {}
+        missing = {}
+        for turn in turns:
+            nb_vertices, edges, indices = graph_arrays(self.history[turn])
+            pivots = self._pivots(nb_vertices)
+            key = (turn, content_hash(nb_vertices, edges), EXACT if pivots is None else "pivots{0}".format(pivots))
+            keys[turn] = (key, indices)
+            self.modes[turn] = key[2]
+            if self._lookup(key) is None and key not in missing:
+                missing[key] = (nb_vertices, edges, pivots, self.seed + turn)
+
+        if len(missing) == 1 or self.processes == 1:
+            for (key, task) in missing.items():
+                self._store(key, _betweenness(task))
+        elif missing:
+            with ProcessPoolExecutor(self.processes) as executor:
+                for (key, result) in zip(missing, executor.map(_betweenness, missing.values())):
+                    self._store(key, result)
+        return keys
+
+    def betweenness(self, turn):
+        """
+        :param turn: Turn number
+        :return: (vertices betweenness array, edges betweenness array sorted by source then target)
+        """
+        key, indices = self.compute([turn])[turn]
+        return self._lookup(key)
+
+    def betweenness_maps(self, turn):
+        """
+        :param turn: Turn number
+        :return: (vertices betweenness, edges betweenness) property maps of the graph of the turn
+        """
+        graph = self.history[turn]
+        key, indices = self.compute([turn])[turn]
+        vertex_values, edge_values = self._lookup(key)
+        vertex = graph.new_vertex_property("double")
+        vertex.get_array()[:] = vertex_values
+        edge = graph.new_edge_property("double")
+        edge.get_array()[indices] = edge_values
+        return vertex, edge
+
+    def summary(self, turns=None):
+        """
+        Average, median and standard deviation of the vertices betweenness of each turn,
+        see mode() for the way it was computed
+        :param turns: Turns numbers, all the turns by default
+        :return: [{ 'average' : …, 'median' : …, 'std' : … }, …] per turn
+        """
+        keys = self.compute(turns)
+        summaries = []
+        for turn in sorted(keys):
+            values = np.asarray(self._lookup(keys[turn][0])[0])
+            if len(values) == 0:
+                summaries.append({'average': 0., 'median': 0., 'std': 0.})
+            else:
+                summaries.append({'average': float(np.average(values)), 'median': float(np.median(values)),
+                                  'std': float(np.std(values))})
+        return summaries
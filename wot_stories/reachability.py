@@ -0,0 +1,73 @@
+import numpy as np
+
+
+def in_adjacency(sources, targets, nb_vertices):
+    """
+    Compressed adjacency of the reversed graph : the in-neighbours of vertex v
+    are indices[indptr[v]:indptr[v+1]]
+    :param sources: Array of edges sources
+    :param targets: Array of edges targets
+    :param nb_vertices: Number of vertices in the graph
+    :return: (indptr, indices)
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    order = np.argsort(targets, kind='stable')
+    indptr = np.zeros(nb_vertices + 1, dtype=np.int64)
+    np.cumsum(np.bincount(targets, minlength=nb_vertices), out=indptr[1:])
+    return indptr, sources[order]
+
+
+def reached_sentries(indptr, indices, candidates, sentries, steps_max, needed=None):
+    """
+    Count the sentries from which each candidate can be reached in at most steps_max hops.
+    A single breadth first search is run over the reversed graph from all the candidates
+    at once, each vertex carrying the bitset of the candidates which reached it.
+    :param indptr: Reversed graph adjacency, as returned by in_adjacency
+    :param indices: Reversed graph adjacency, as returned by in_adjacency
+    :param candidates: List of candidates public keys
+    :param sentries: Collection of sentries public keys
+    :param steps_max: Maximum number of hops, None for no limit
+    :param needed: Number of sentries after which a candidate stops being tracked, None to count all of them
+    :return: (list of reached sentries counts per candidate, number of visited vertices)
+    """
+    sentries = set(sentries)
+    counts = [0] * len(candidates)
+    active = (1 << len(candidates)) - 1
+
+    frontier = {}
+    for (i, c) in enumerate(candidates):
+        frontier[c] = frontier.get(c, 0) | (1 << i)
+
+    reach = {}      # { vertex : bitset of candidates which reached it }
+    step = 0
+    while frontier:
+        done = 0
+        for (v, bits) in frontier.items():
+            reach[v] = reach.get(v, 0) | bits
+            if v in sentries:
+                while bits:
+                    low = bits & -bits
+                    i = low.bit_length() - 1
+                    counts[i] += 1
+                    if needed is not None and counts[i] >= needed:
+                        done |= low
+                    bits ^= low
+        active &= ~done
+
+        if not active or (steps_max is not None and step >= steps_max):
+            break
+        step += 1
+
+        next_frontier = {}
+        for (v, bits) in frontier.items():
+            bits &= active
+            if not bits:
+                continue
+            for u in indices[indptr[v]:indptr[v + 1]].tolist():
+                new = bits & ~reach.get(u, 0)
+                if new:
+                    next_frontier[u] = next_frontier.get(u, 0) | new
+        frontier = next_frontier
+
+    return counts, len(reach)
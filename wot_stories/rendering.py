@@ -0,0 +1,90 @@
+from matplotlib.colors import to_rgba
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+import numpy as np
+
+
+def positions(pos, keys):
+    """
+    :param pos: Array of (x, y) indexed by vertex, or dict { key : (x, y) }
+    :param keys: Vertices or keys
+    :return: Array of (x, y) of the keys
+    """
+    if isinstance(pos, np.ndarray):
+        return pos[np.asarray(keys, dtype=np.int64)]
+    return np.array([pos[k] for k in keys], dtype=float).reshape(-1, 2)
+
+
+def thin(nb_items, max_items):
+    """
+    Evenly spaced selection of items
+    :param nb_items: Number of items
+    :param max_items: Maximum number of items kept, None to keep them all
+    :return: Array of the indices of the kept items
+    """
+    if max_items is None or nb_items <= max_items:
+        return np.arange(nb_items)
+    return np.unique(np.linspace(0, nb_items - 1, max_items).astype(np.int64))
+
+
+def _segments(xy_from, xy_to, z_from, z_to):
+    segments = np.empty((len(xy_from), 2, 3))
+    segments[:, 0, :2] = xy_from
+    segments[:, 0, 2] = z_from
+    segments[:, 1, :2] = xy_to
+    segments[:, 1, 2] = z_to
+    return segments
+
+
+def draw_timeline(ax, pos, history, past_links, colors, zscale=1, alphas=(1., 0.5), links_alpha=0.1,
+                  max_links=None):
+    """
+    Draw the history of a Wot in a 3d axis, with the time as vertical axis : a vertical line
+    per membership period of each identity, and an horizontal line per certification at the
+    time it was issued. Each kind of line is a single collection, so that the number of
+    matplotlib artists does not grow with the Wot.
+    :param ax: Matplotlib 3d axis
+    :param pos: Positions of the identities, array of (x, y) indexed by vertex or dict { pubkey : (x, y) }
+    :param history: { pubkey : [join_time, leave_time, join_time, leave_time, …] }
+    :param past_links: Certifications [(block_number, from_idty, to_idty), …], or an array of such rows
+    :param colors: { pubkey : (color name, color code) }
+    :param zscale: Height of a turn
+    :param alphas: Transparency of the even periods (from a join to a leave) and of the odd ones
+    :param links_alpha: Transparency of the certifications
+    :param max_links: Maximum number of certifications drawn, evenly sampled in time, None to draw them all
+    :return: Number of certifications drawn
+    """
+    periods = [[], []]      # [[(pubkey, start, stop), …] even periods, […] odd periods]
+    for n in history:
+        if n not in colors:
+            continue
+        for (i, (start, stop)) in enumerate(zip(history[n], history[n][1:])):
+            periods[i % 2].append((n, start, stop))
+
+    for (kind, alpha) in zip(periods, alphas):
+        if not kind:
+            continue
+        keys = [p[0] for p in kind]
+        xy = positions(pos, keys)
+        starts = np.array([p[1] for p in kind], dtype=float) * zscale
+        stops = np.array([p[2] for p in kind], dtype=float) * zscale
+        ax.add_collection3d(Line3DCollection(_segments(xy, xy, starts, stops),
+                                             colors=[to_rgba(colors[k][0], alpha) for k in keys]))
+
+    if isinstance(past_links, np.ndarray):
+        links = past_links.reshape(-1, 3)
+        turns, issuers, receivers = links[:, 0], links[:, 1].tolist(), links[:, 2].tolist()
+    else:
+        turns = np.array([link[0] for link in past_links], dtype=float)
+        issuers = [link[1] for link in past_links]
+        receivers = [link[2] for link in past_links]
+    kept = [i for i in thin(len(issuers), max_links).tolist() if issuers[i] in colors]
+    if kept:
+        rgba = {}
+        for i in kept:
+            if issuers[i] not in rgba:
+                rgba[issuers[i]] = to_rgba(colors[issuers[i]][0], links_alpha)
+        z = np.asarray(turns, dtype=float)[kept] * zscale
+        ax.add_collection3d(Line3DCollection(_segments(positions(pos, [receivers[i] for i in kept]),
+                                                       positions(pos, [issuers[i] for i in kept]), z, z),
+                                             colors=[rgba[issuers[i]] for i in kept]))
+    return len(kept)
@@ -0,0 +1,382 @@
+from itertools import product
+import numpy as np
+
+from .sentries import SentryTracker, y_sentries
+from .membership import MembershipTable, IdentityTable
+from .issuers import ArrayIssuerTable, TOO_MANY_CERTIFICATIONS, TOO_RECENT_CERTIFICATION
+from .backends import SerialBackend
+from .stats import TurnStats
+from .certifications import CertificationLog
+from .events import (EventSink, NEW_TURN, IDENTITY_ADDED, LINK_ADDED, LINK_REJECTED, LINK_EXPIRED, JOINED,
+                     JOIN_REFUSED, LEFT, SELF_CERTIFICATION, NOT_ENOUGH_CERTIFICATIONS, NOT_ENOUGH_SENTRIES)
+
+
+class WoTRules:
+    def __init__(self, sig_period, sig_stock, sig_validity, sig_qty, xpercent, steps_max, wot, backend=None,
+                 events=None):
+        """
+        Wot rules shared by the engines with identities numbered from 0, whatever the graph is stored in.
+        The graph store is a GraphHistory or an EdgeTable, which both provide add_vertices, add_edge,
+        add_edges, remove_edge, time, in_degree, edges, in_adjacency, nb_vertices and commit.
+        :param sig_period:      Minimum time (in number of blocks) that an individual has to wait to issue a new certificate
+        :param sig_stock:       Maximum number of valid certifications that an individual can issue
+        :param sig_validity:    Validity period (in number of blocks) of a certification
+        :param sig_qty:         Number of valid certifications an individual must have to be a member
+        :param xpercent:        Percentage of sentries an individual must reach via in_edges in the Wot to be a member
+        :param steps_max:       Maximum number of hops via in_edges that can be done to reach a sentry
+        :param wot:             Graph store of the certifications
+        :param backend:         Execution backend of the distance computations, see backends.make_backend.
+                                Defaults to a serial backend
+        :param events:          EventSink receiving the simulation events, see events.EVENTS
+        """
+        self.sig_period = sig_period
+        self.sig_stock = sig_stock
+        self.sig_validity = sig_validity
+        self.sig_qty = sig_qty
+        self.xpercent = xpercent
+        self.steps_max = steps_max
+
+        self.wot = wot
+        self.members = MembershipTable()
+        self.identities = IdentityTable()
+        self.received_links = []
+
+        #Block number
+        self.turn = 0
+
+        self.history = {}       # { member_pubkey : [join_time, leave_time, join_time, leave_time, …] }
+        self.past_links = CertificationLog()    # (block_number, from_idty, to_idty) of each certification
+        self.expirations = {}   # { block_number : [(from_idty, to_idty), …] } links to expire at this turn
+
+        self.issuers = ArrayIssuerTable()
+        self.sentry_tracker = SentryTracker()
+        self.current_sentries = []  # Sentries of the current turn
+
+        self.backend = backend or SerialBackend()
+        self.stats = TurnStats()
+        self.events = events or EventSink()
+
+    def _track_identity(self, idty, turn):
+        """
+        Keep track of memberships in time
+        :param idty: Public key of a new identity
+        :param turn: Block number from which the identity exists
+        """
+        if idty not in self.history:
+            self.history[idty] = [turn]
+
+    def initialize(self, nb_identities):
+        """
+        Initialize the Wot with first members (typically block 0), all certifying each other
+        :param nb_identities: Number of identities
+        """
+        # Populate the graph with identities and certifications
+        first = self.wot.add_vertices(nb_identities)
+        for idty in range(first, first + nb_identities):
+            self.events.emit(IDENTITY_ADDED, idty, self.turn)
+            self._track_identity(idty, self.turn)
+            self.identities.add(idty)
+
+        for (source, target) in product(self.identities[0], self.identities[0]):
+            if source != target:
+                self.events.emit(LINK_ADDED, source, target, 0)
+                self.wot.add_edge(source, target, 0)
+                self.issuers.issued(source, 0, True)
+                self._schedule_expiration(source, target, 0)
+                # Keep track of certifications for future analysis and plotting
+                self.past_links.append(0, source, target)
+
+        # Check if identities are members according to Wot rules
+        for idty in range(0, self.wot.nb_vertices):
+            self.sentry_tracker.update(idty, self.issuers.count(idty))
+            in_degree = self.wot.in_degree(idty)
+            if in_degree >= self.sig_qty:
+                self.events.emit(JOINED, idty, self.turn)
+                self.members.add(idty)
+                self.sentry_tracker.join(idty)
+                self.history[idty].append(self.turn)
+            else:
+                self.events.emit(JOIN_REFUSED, idty, NOT_ENOUGH_CERTIFICATIONS, in_degree, self.sig_qty)
+        self._prepare_next_turn()
+
+    def _prepare_next_turn(self):
+        """
+        Freeze the current state of the Wot and start the next turn
+        """
+        self.received_links = []
+        with self.stats.phase('sentries'):
+            self.current_sentries = list(self.sentry_tracker)
+        self.stats.set('members', self.members.size)
+        self.stats.set('identities', self.identities.counts[-1])
+        with self.stats.phase('commit'):
+            self.wot.commit()
+            self.members.commit()
+            self.identities.commit()
+
+    def add_identity(self):
+        """
+        Add an identity (still not member) to the graph
+        :return: Public key of the new identity
+        """
+        idty = self.wot.add_vertices(1)
+        self.events.emit(IDENTITY_ADDED, idty, self.turn)
+        self._track_identity(idty, self.turn+1)
+        self.identities.add(idty)
+        return idty
+
+    def add_identities(self, nb_identities):
+        """
+        Add several identities (still not members) to the graph at once
+        :param nb_identities: Number of new identities
+        :return: Numpy array of the public keys of the new identities
+        """
+        first = self.wot.add_vertices(nb_identities)
+        idties = np.arange(first, first + nb_identities)
+        for idty in idties.tolist():
+            self._track_identity(idty, self.turn+1)
+            self.identities.add(idty)
+            self.events.emit(IDENTITY_ADDED, idty, self.turn)
+        return idties
+
+    def add_link(self, from_idty, to_idty):
+        """
+        Checks the validity of the certification and adds it in the graph if ok
+        :param from_idty: Public key of the member which issue the certificate
+        :param to_idty: Public key of the certified individual
+        """
+        if from_idty == to_idty:
+            self.events.emit(LINK_REJECTED, from_idty, to_idty, SELF_CERTIFICATION)
+            return
+
+        # Checks the issuer signatures "stock" and the time since his last certificate
+        refused = self.issuers.check(from_idty, self.turn, self.sig_stock, self.sig_period)
+        if refused:
+            self.events.emit(LINK_REJECTED, from_idty, to_idty, refused)
+            return
+
+        # Adds the certificate to the graph and keeps track
+        self.events.emit(LINK_ADDED, from_idty, to_idty, self.turn)
+        new = self.wot.time(from_idty, to_idty) is None
+        self.wot.add_edge(from_idty, to_idty, self.turn)
+        self.issuers.issued(from_idty, self.turn, new)
+        self._schedule_expiration(from_idty, to_idty, self.turn)
+        self.sentry_tracker.update(from_idty, self.issuers.count(from_idty))
+        self.past_links.append(self.turn, from_idty, to_idty)
+
+        # Checks if the certified individual must join the wot as a member
+        if to_idty not in self.members[self.turn+1]:
+            self.received_links.append(to_idty)
+
+    def add_links(self, from_idties, to_idties):
+        """
+        Checks the validity of several certifications and adds the valid ones in the graph.
+        The result is the same as calling add_link on each certification in order.
+        :param from_idties: Array of public keys of the members which issue the certificates
+        :param to_idties: Array of public keys of the certified individuals
+        :return: Boolean numpy array, True for the accepted certifications
+        """
+        sources = np.asarray(from_idties, dtype=np.int64)
+        targets = np.asarray(to_idties, dtype=np.int64)
+        accepted = sources != targets
+
+        # Renewals are certifications already in the graph, or already requested earlier in the batch
+        nb_keys = self.wot.nb_vertices + 1
+        edges_sources, edges_targets = self.wot.edges()
+        renewal = np.isin(sources * nb_keys + targets, edges_sources * nb_keys + edges_targets)
+        candidates = np.flatnonzero(accepted)
+        if len(candidates) == 0:
+            if self.events.wants(LINK_REJECTED):
+                for (s, t) in zip(sources.tolist(), targets.tolist()):
+                    self.events.emit(LINK_REJECTED, s, t, SELF_CERTIFICATION)
+            return accepted
+        keys = sources[candidates] * nb_keys + targets[candidates]
+        first_requests = np.unique(keys, return_index=True)[1]
+        repeated = np.ones(len(candidates), dtype=bool)
+        repeated[first_requests] = False
+        renewal[candidates[repeated]] = True
+
+        # Group the requests by issuer, keeping their order inside each group
+        order = candidates[np.argsort(sources[candidates], kind='stable')]
+        issuers = sources[order]
+        first_of_group = np.concatenate(([True], issuers[1:] != issuers[:-1]))
+        group_start = np.flatnonzero(first_of_group)
+        group = np.cumsum(first_of_group) - 1
+        position = np.arange(len(order)) - group_start[group]
+        new = ~renewal[order]
+        new_before = np.cumsum(new) - new
+        new_before = new_before - new_before[group_start][group]
+
+        # Checks the issuer signatures "stock" : the new certifications accepted earlier in the batch count
+        counts, latest = self.issuers.state(issuers)
+        valid = counts + new_before < self.sig_stock
+        # Checks if the issuer has waited enough time since his last certificate :
+        # after a first certification in the batch, the next ones are always too recent
+        if self.sig_period > 0:
+            valid &= (position == 0) & ((counts == 0) | (latest + self.sig_period <= self.turn))
+        accepted[order] = valid
+
+        if self.events.wants(LINK_REJECTED):
+            # Only the new certifications accepted earlier in the batch have been taken from the stock
+            accepted_new = new & valid
+            accepted_before = np.cumsum(accepted_new) - accepted_new
+            accepted_before = accepted_before - accepted_before[group_start][group]
+            reasons = np.full(len(sources), SELF_CERTIFICATION, dtype=object)
+            reasons[order] = np.where(counts + accepted_before >= self.sig_stock,
+                                      TOO_MANY_CERTIFICATIONS, TOO_RECENT_CERTIFICATION)
+            for i in np.flatnonzero(~accepted).tolist():
+                self.events.emit(LINK_REJECTED, int(sources[i]), int(targets[i]), reasons[i])
+
+        # Adds the certificates to the graph and keeps track
+        added = np.flatnonzero(accepted)
+        added_new = added[~renewal[added]]
+        self.wot.add_edges(sources[added_new], targets[added_new], self.turn)
+        for i in added[renewal[added]].tolist():
+            self.wot.add_edge(int(sources[i]), int(targets[i]), self.turn)
+        self.issuers.issued_many(sources[added], self.turn, ~renewal[added])
+
+        added_sources = sources[added].tolist()
+        added_targets = targets[added].tolist()
+        self._schedule_expirations(zip(added_sources, added_targets), self.turn)
+        for idty in set(added_sources):
+            self.sentry_tracker.update(idty, self.issuers.count(idty))
+        self.past_links.extend(self.turn, sources[added], targets[added])
+        if self.events.wants(LINK_ADDED):
+            for (s, t) in zip(added_sources, added_targets):
+                self.events.emit(LINK_ADDED, s, t, self.turn)
+
+        # Checks if the certified individuals must join the wot as members
+        next_members = self.members[self.turn+1]
+        self.received_links.extend(t for t in added_targets if t not in next_members)
+
+        return accepted
+
+    def _schedule_expiration(self, from_idty, to_idty, time):
+        """
+        Register a certification to be checked for expiration at the end of its validity
+        :param from_idty: Public key of the issuer
+        :param to_idty: Public key of the certified individual
+        :param time: Block number of the certification
+        """
+        self._schedule_expirations([(from_idty, to_idty)], time)
+
+    def _schedule_expirations(self, links, time):
+        """
+        Register certifications issued at the same time to be checked for expiration at the end of their validity
+        :param links: Iterable of (from_idty, to_idty) public keys
+        :param time: Block number of the certifications
+        """
+        self.expirations.setdefault(time + self.sig_validity + 1, []).extend(links)
+
+    def ySentries(self, N):
+        return y_sentries(N)
+
+    def linked_sentries(self, wot, sentries, candidates):
+        """
+        Count the sentries linked to each candidate at steps_max via certificates (edges),
+        with a single search over the graph for all the candidates
+        :param wot:         Graph store to analyse
+        :param sentries:    List of sentries
+        :param candidates:  List of candidates pubkeys
+        :return: { candidate : number of linked sentries }
+        """
+        # Candidates without enough certifications cannot join whatever their sentries
+        candidates = list(dict.fromkeys(candidates))
+        self.stats.count('candidates', len(candidates))
+        candidates = [c for c in candidates if wot.in_degree(c) >= self.sig_qty]
+        # Without sentries the distance rule holds for everyone, there is nothing to search
+        if not sentries:
+            return {c: 0 for c in candidates}
+        if self.steps_max == 0:
+            return {c: len(sentries) for c in candidates}
+
+        indptr, indices = wot.in_adjacency()
+        counts, visited = self.backend.reached_sentries(indptr, indices, candidates, sentries,
+                                                        self.steps_max, len(sentries)*self.xpercent)
+        self.stats.count('visited', visited)
+        return dict(zip(candidates, counts))
+
+    def can_join(self, wot, sentries, linked, idty):
+        """
+        Checks if an individual must join the wot as a member regarding the wot rules
+        Protocol 0.2
+        :param wot:     Graph store to analyse
+        :param sentries: List of sentries
+        :param linked:  Number of sentries linked to each candidate, as returned by linked_sentries
+        :param idty:    Pubkey of the candidate
+        :return: False or True
+        """
+        # Checks if idty has enough certificates to be a member
+        in_degree = wot.in_degree(idty)
+        if in_degree < self.sig_qty:
+            self.events.emit(JOIN_REFUSED, idty, NOT_ENOUGH_CERTIFICATIONS, in_degree, self.sig_qty)
+            return False
+
+        # Checks if idty is connected to at least xpercent of sentries
+        enough_sentries = linked.get(idty, 0) >= len(sentries)*self.xpercent
+        if not enough_sentries:
+            self.events.emit(JOIN_REFUSED, idty, NOT_ENOUGH_SENTRIES, linked.get(idty, 0),
+                             len(sentries)*self.xpercent)
+
+        return enough_sentries
+
+    # Nothing is awaited anymore : next_turn is kept async only for interface compatibility
+    # with the existing drivers, which run it in an event loop (perfect_wot, benchmark)
+    async def next_turn(self):
+        """
+        Updates the wot by removing expired links and members
+        """
+        dropped_links = []
+        self.events.emit(NEW_TURN, self.turn+1)
+        self.stats.start_turn(self.turn+1, backend=self.backend.name)
+
+        # Links expirations
+        with self.stats.phase('expiry'):
+            for (source, target) in self.expirations.pop(self.turn, []):
+                time = self.wot.time(source, target)
+                # The link may have been renewed or already removed since it was scheduled
+                if time is not None and self.turn > time + self.sig_validity:
+                    self.events.emit(LINK_EXPIRED, source, target, self.turn+1)
+                    self.wot.remove_edge(source, target)
+                    self.issuers.expired(source)
+                    self.sentry_tracker.update(source, self.issuers.count(source))
+                    dropped_links.append(target)
+        self.stats.set('expired', len(dropped_links))
+
+        computed_links = dropped_links + self.received_links
+
+        with self.stats.phase('distance'):
+            sentries = self.current_sentries
+            linked = self.linked_sentries(self.wot, sentries, computed_links)
+
+        with self.stats.phase('joins'):
+            for receiver in self.received_links:
+                if receiver not in self.members[self.turn + 1] and self.can_join(self.wot,
+                                                                                    sentries,
+                                                                                    linked,
+                                                                                    receiver):
+                    self.events.emit(JOINED, receiver, self.turn)
+                    self.history[receiver].append(self.turn)
+                    self.members.add(receiver)
+                    self.sentry_tracker.join(receiver)
+                    self.stats.count('joined')
+
+        with self.stats.phase('leaves'):
+            for dropped in dropped_links:
+                if dropped in self.members[self.turn+1] and not self.can_join(self.wot,
+                                                                              sentries,
+                                                                              linked,
+                                                                              dropped):
+                    self.events.emit(LEFT, dropped, self.turn+1)
+                    self.members.remove(dropped)
+                    self.sentry_tracker.leave(dropped)
+                    self.history[dropped].append(self.turn+1)
+                    self.stats.count('left')
+
+        self.turn += 1
+        self._prepare_next_turn()
+        self.stats.end_turn()
+
+    def end(self):
+        for n in self.history:
+            if len(self.history[n]) % 2 == 0:
+                self.history[n].append(self.turn)
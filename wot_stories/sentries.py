@@ -0,0 +1,78 @@
+from bisect import bisect_right
+
+# (Minimum number of members, number of certifications a member must have issued to be a sentry)
+Y_SENTRIES = ((10, 2), (100, 4), (1000, 6), (10000, 12), (100000, 20))
+_Y_BOUNDARIES = [n for (n, y) in Y_SENTRIES]
+
+
+def y_sentries(nb_members):
+    """
+    Number of certifications a member must have issued to be a sentry
+    :param nb_members: Number of members in the Wot
+    :return: The sentry threshold
+    """
+    i = bisect_right(_Y_BOUNDARIES, nb_members)
+    return Y_SENTRIES[i - 1][1] if i > 0 else 0
+
+
+class SentryTracker:
+    def __init__(self):
+        """
+        Incrementally maintained set of sentries.
+        Out degrees and memberships are updated as they change, and the sentry
+        set is only fully recomputed when the number of members crosses a
+        y_sentries boundary.
+        """
+        self.degrees = {}       # { idty : number of issued certifications }
+        self.members = set()
+        self.sentries = set()
+        self.threshold = y_sentries(0)
+
+    def __contains__(self, idty):
+        return idty in self.sentries
+
+    def __len__(self):
+        return len(self.sentries)
+
+    def __iter__(self):
+        return iter(self.sentries)
+
+    def _check(self, idty):
+        if self.degrees.get(idty, 0) > self.threshold:
+            self.sentries.add(idty)
+        else:
+            self.sentries.discard(idty)
+
+    def _rethreshold(self):
+        threshold = y_sentries(len(self.members))
+        if threshold != self.threshold:
+            self.threshold = threshold
+            self.sentries = {m for m in self.members if self.degrees.get(m, 0) > threshold}
+
+    def update(self, idty, degree):
+        """
+        Update the number of certifications issued by an identity
+        :param idty: Public key of the identity
+        :param degree: Number of valid certifications it has issued
+        """
+        self.degrees[idty] = degree
+        if idty in self.members:
+            self._check(idty)
+
+    def join(self, idty):
+        """
+        An identity became a member
+        :param idty: Public key of the identity
+        """
+        self.members.add(idty)
+        self._rethreshold()
+        self._check(idty)
+
+    def leave(self, idty):
+        """
+        A member left the community
+        :param idty: Public key of the identity
+        """
+        self.members.discard(idty)
+        self.sentries.discard(idty)
+        self._rethreshold()
@@ -0,0 +1,100 @@
+from contextlib import contextmanager
+import time
+import csv
+
+# Timed phases of a turn, in seconds
+PHASES = ('expiry', 'sentries', 'distance', 'joins', 'leaves', 'commit')
+# Counters of a turn
+COUNTERS = ('expired', 'candidates', 'visited', 'joined', 'left')
+# Sizes of the Wot at the end of a turn
+GAUGES = ('members', 'identities')
+
+
+class TurnStats:
+    def __init__(self):
+        """
+        Wall time of each phase and counters of each simulated turn, one row per turn
+        """
+        self.rows = []      # [{ column : value }, …]
+        self.current = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def start_turn(self, turn, **labels):
+        """
+        Open the row of a turn
+        :param turn: Turn number
+        :param labels: Extra columns of the row, ie the backend name
+        """
+        self.current = dict.fromkeys(PHASES, 0.)
+        self.current.update(dict.fromkeys(COUNTERS + GAUGES, 0))
+        self.current['turn'] = turn
+        self.current.update(labels)
+
+    def end_turn(self):
+        """
+        Close the row of the current turn
+        """
+        self.rows.append(self.current)
+        self.current = None
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a phase of the current turn, the time of a phase run several times is summed
+        :param name: Phase name, see PHASES
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.current is not None:
+                self.current[name] += time.perf_counter() - start
+
+    def count(self, name, value=1):
+        """
+        Increment a counter of the current turn
+        :param name: Counter name, see COUNTERS
+        :param value: Increment
+        """
+        if self.current is not None:
+            self.current[name] += value
+
+    def set(self, name, value):
+        """
+        Set a counter or a gauge of the current turn
+        :param name: Counter or gauge name, see COUNTERS and GAUGES
+        :param value: Value
+        """
+        if self.current is not None:
+            self.current[name] = value
+
+    def columns(self):
+        """
+        :return: List of the columns names, turn first
+        """
+        columns = ['turn']
+        for row in self.rows:
+            columns.extend(c for c in row if c not in columns)
+        return columns
+
+    def totals(self):
+        """
+        :return: { phase or counter : sum over all turns }
+        """
+        return {name: sum(row[name] for row in self.rows) for name in PHASES + COUNTERS}
+
+    def to_csv(self, path):
+        """
+        Export the table as a csv file
+        :param path: File path
+        """
+        columns = self.columns()
+        with open(path, 'w', newline='') as outfile:
+            writer = csv.DictWriter(outfile, columns)
+            writer.writeheader()
+            writer.writerows(self.rows)
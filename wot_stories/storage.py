@@ -0,0 +1,46 @@
+from array import array
+import numpy as np
+import os, errno
+
+
+def save_arrays(dest, arrays):
+    """
+    Save flat arrays in a directory, one .npy file per array
+    :param dest: Directory path, created if needed
+    :param arrays: { name : numpy array }
+    """
+    try:
+        os.makedirs(dest)
+    except OSError as exception:
+        if exception.errno != errno.EEXIST:
+            raise
+    for name, values in arrays.items():
+        np.save(os.path.join(dest, name + ".npy"), values)
+
+
+def load_arrays(dest, names, mmap_mode='r'):
+    """
+    Open arrays saved with save_arrays. They are memory-mapped by default,
+    so only the parts actually used are read from the disk.
+    :param dest: Directory path
+    :param names: Names of the arrays
+    :param mmap_mode: Numpy memory-map mode, None to read the arrays in memory
+    :return: { name : numpy array }
+    """
+    return {name: np.load(os.path.join(dest, name + ".npy"), mmap_mode=mmap_mode) for name in names}
+
+
+def column(values, dtype=np.int64, start=None, stop=None):
+    """
+    Numpy array of a slice of a column, which is either a growing array.array or a saved numpy array.
+    The array.array slice is copied since an array exporting its buffer cannot grow anymore,
+    a numpy array slice is a view.
+    :param values: array.array or numpy array
+    :param dtype: Numpy type of the array.array values
+    :param start: First index of the slice
+    :param stop: Index after the slice
+    :return: Numpy array
+    """
+    if isinstance(values, array):
+        return np.array(values[start:stop], dtype=dtype)
+    return np.asarray(values[start:stop])
@@ -0,0 +1,80 @@
+from multiprocessing import Pool
+from itertools import product
+import numpy as np
+import asyncio
+import random
+import csv
+
+from .fast_wot import WoT
+
+# Parameters of the WoT constructor written in the result table
+PARAMETERS = ('sig_period', 'sig_stock', 'sig_validity', 'sig_qty', 'xpercent', 'steps_max')
+
+
+def grid(base, **ranges):
+    """
+    Cartesian product of parameter values
+    :param base: Dict of the parameters values common to all the runs
+    :param ranges: Lists of values for the explored parameters, ie sig_qty=[3, 5]
+    :return: List of dicts of parameters
+    """
+    names = sorted(ranges.keys())
+    parameters = []
+    for values in product(*[ranges[n] for n in names]):
+        p = dict(base)
+        p.update(zip(names, values))
+        parameters.append(p)
+    return parameters
+
+
+def run_one(task):
+    """
+    Run one seeded simulation and keep only its summary metrics
+    :param task: (model, parameters, seed, nb_turns)
+    :return: (parameters, seed, [(turn, nb_members, nb_identities), …], time to death or None)
+    """
+    model, parameters, seed, nb_turns = task
+    random.seed(seed)
+    np.random.seed(seed)
+
+    rows = []
+
+    def on_turn(wot):
+        rows.append((wot.turn, len(wot.members[wot.turn]), len(wot.identities[wot.turn])))
+
+    wot = WoT(**parameters)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(model(wot, nb_turns, on_turn))
+    finally:
+        loop.close()
+
+    death = next((turn for (turn, nb_members, nb_identities) in rows if nb_members == 0), None)
+    return parameters, seed, rows, death
+
+
+def sweep(model, parameters, seeds, nb_turns, output, processes=None):
+    """
+    Run simulations for every parameters set and seed in a process pool.
+    Each run only sends back its metrics, which are streamed in a single csv table.
+    :param model: Coroutine function model(wot, nb_turns, on_turn) growing the wot,
+                  calling on_turn(wot) after each turn. It must be importable by the workers.
+    :param parameters: List of dicts of WoT parameters, see grid
+    :param seeds: List of random seeds
+    :param nb_turns: Number of turns of each simulation
+    :param output: Path of the csv result table
+    :param processes: Number of workers, defaults to the number of cores
+    """
+    tasks = [(model, p, seed, nb_turns) for p in parameters for seed in seeds]
+    with open(output, 'w', newline='') as outfile, Pool(processes, maxtasksperchild=1) as pool:
+        writer = csv.writer(outfile)
+        writer.writerow(PARAMETERS + ('seed', 'turn', 'members', 'identities', 'time_to_death'))
+        for (i, (p, seed, rows, death)) in enumerate(pool.imap_unordered(run_one, tasks)):
+            for (turn, nb_members, nb_identities) in rows:
+                writer.writerow([p[name] for name in PARAMETERS] +
+                                [seed, turn, nb_members, nb_identities, '' if death is None else death])
+            outfile.flush()
+            print('\r[{0}{1}] {2:10.2f}% - Sweeping...'.format('#' * int((i + 1) / len(tasks) * 10),
+                  ' ' * (10 - int((i + 1) / len(tasks) * 10)),
+                  (i + 1) / len(tasks) * 100))
@@ -1,13 +1,20 @@
 import networkx
-from numpy import linspace
 from matplotlib import pyplot as plt
 from matplotlib import colors
 from mpl_toolkits.mplot3d import Axes3D
 
 from networkx.drawing.nx_agraph import graphviz_layout
 
+from .sentries import SentryTracker, y_sentries
+from .issuers import IssuerTable
+from .stats import TurnStats
+from .rendering import draw_timeline
+from .certifications import CertificationLog
+from .events import (EventSink, NEW_TURN, IDENTITY_ADDED, LINK_ADDED, LINK_REJECTED, LINK_EXPIRED, JOINED,
+                     JOIN_REFUSED, LEFT, NOT_ENOUGH_CERTIFICATIONS, NOT_ENOUGH_SENTRIES)
+
 class WoT:
-    def __init__(self, sig_period, sig_stock, sig_validity, sig_qty, xpercent, steps_max):
+    def __init__(self, sig_period, sig_stock, sig_validity, sig_qty, xpercent, steps_max, events=None):
         """
         :param sig_period:      Minimum time (in number of blocks) that an individual has to wait to issue a new certificate
         :param sig_stock:       Maximum number of valid certifications that an individual can issue
@@ -15,6 +22,7 @@ class WoT:
         :param sig_qty:         Number of valid certifications an individual must have to be a member
         :param xpercent:        Percentage of sentries an individual must reach via in_edges in the Wot to be a member
         :param steps_max:       Maximum number of hops via in_edges that can be done to reach a sentry
+        :param events:          EventSink receiving the simulation events, see events.EVENTS
         """
 
         self.sig_period = sig_period
@@ -24,10 +32,15 @@ class WoT:
         self.xpercent = xpercent
         self.steps_max = steps_max
 
+        # Single live graph : past turns are described by the history and the certifications log
         self.wot = networkx.DiGraph()
-        self.next_wot = networkx.DiGraph()
         self.members = []
         self.next_members = []
+        # Certifications issued in the live graph by each issuer
+        self.issuers = IssuerTable()
+        # Sentries among current members, regarding certifications issued in the live graph
+        self.sentry_tracker = SentryTracker()
+        self.expirations = {}   # { block_number : [(from_idty, to_idty), …] } links to expire at this turn
 
         #Block number
         self.turn = 0
@@ -36,11 +49,36 @@ class WoT:
         self.ax = self.fig.gca(projection='3d')
 
         self.history = {}       # { member_pubkey : [join_time, leave_time, join_time, leave_time, …] }
-        self.past_links = []    # [(block_number, from_idty, to_idty),(…)]
+        self.past_links = CertificationLog(interned=True)    # (block_number, from_idty, to_idty) of each certification
 
         self.colors = {}
         self.color_iter = iter(colors.cnames.items())
-        self.layouts = []
+        self.events = events or EventSink()
+        self.stats = TurnStats()
+
+    def get_state(self):
+        """
+        State of the Wot, to be pickled
+        :return: Dict of the Wot attributes, without the drawing objects and the events subscribers
+        """
+        state = self.__dict__.copy()
+        del state['fig']
+        del state['ax']
+        del state['events']
+        # Iterators cannot be pickled, keep the colors not used yet instead
+        remaining_colors = list(self.color_iter)
+        self.color_iter = iter(remaining_colors)
+        state['color_iter'] = remaining_colors
+        return state
+
+    def set_state(self, state):
+        """
+        Restore a state returned by get_state
+        :param state: Dict of the Wot attributes
+        """
+        state = state.copy()
+        state['color_iter'] = iter(state['color_iter'])
+        self.__dict__.update(state)
 
     def initialize(self, idties, links):
         """
@@ -51,22 +89,26 @@ class WoT:
 
         # Populate the graph with identities and certifications
         for idty in idties:
-            print("{0} - Add identity during init".format(idty))
+            self.events.emit(IDENTITY_ADDED, idty, self.turn)
             self.wot.add_node(idty)
 
         for link in links:
             if link[1] != link[0]:
-                print("{0} -> {1} - Add certification during init".format(link[0], link[1]))
+                self.events.emit(LINK_ADDED, link[0], link[1], 0)
+                self.issuers.issued(link[0], 0, not self.wot.has_edge(link[0], link[1]))
                 self.wot.add_edge(link[0], link[1], {'time': 0})
+                self._schedule_expiration(link[0], link[1], 0)
                 # Keep track of certifications for future analysis and plotting
-                self.past_links.append((0, link[0], link[1]))
+                self.past_links.append(0, link[0], link[1])
 
         # Check if identities are members according to Wot rules
         for node in self.wot.nodes():
+            self.sentry_tracker.update(node, self.issuers.count(node))
             enough_certs = len(self.wot.in_edges(node)) >= self.sig_qty
             if enough_certs:
-                print("{0} joined successfully on init".format(node))
+                self.events.emit(JOINED, node, self.turn)
                 self.members.append(node)
+                self.sentry_tracker.join(node)
 
                 # Keep track of memberships in time
                 if node not in self.history:
@@ -75,15 +117,18 @@ class WoT:
                 self.history[node].append(self.turn)
 
             else:
-                print("Warning : {0} did not join during init".format(node))
+                self.events.emit(JOIN_REFUSED, node, NOT_ENOUGH_CERTIFICATIONS, len(self.wot.in_edges(node)),
+                                 self.sig_qty)
         self._prepare_next_turn()
 
     def _prepare_next_turn(self):
         """
-        Do a copy of the current state of the Wot
+        Start the next turn. Its certifications are added to the live graph,
+        only the members list is copied to know who joins and leaves
         """
-        self.next_wot = self.wot.copy()
-        self.next_members = self.members.copy()
+        self.stats.start_turn(self.turn + 1)
+        with self.stats.phase('commit'):
+            self.next_members = self.members.copy()
 
     def add_identity(self, idty):
         """
@@ -91,8 +136,8 @@ class WoT:
         :param idty: Public key of an individual
         :return:
         """
-        print("{0} : New identity in the wot".format(idty))
-        self.next_wot.add_node(idty)
+        self.events.emit(IDENTITY_ADDED, idty, self.turn)
+        self.wot.add_node(idty)
 
     def add_link(self, from_idty, to_idty):
         """
@@ -102,25 +147,23 @@ class WoT:
         :return:
         """
 
-        # Checks the issuer signatures "stock"
-        out_links = self.next_wot.out_edges(from_idty, data=True)
-        if len(out_links) >= self.sig_stock:
-            print("{0} -> {1} : Too much certifications issued".format(from_idty, to_idty))
-            return
-
-        # Checks if the issuer has waited enough time since his last certificate before emit a new one
-        if len(out_links) > 0 and max([l[2]['time'] for l in out_links]) + self.sig_period > self.turn:
-            print("{0} -> {1} : Latest certification is too recent".format(from_idty, to_idty))
+        # Checks the issuer signatures "stock" and the time since his last certificate
+        refused = self.issuers.check(from_idty, self.turn, self.sig_stock, self.sig_period)
+        if refused:
+            self.events.emit(LINK_REJECTED, from_idty, to_idty, refused)
             return
 
         # Adds the certificate to the graph and keeps track
-        print("{0} -> {1} : Adding certification".format(from_idty, to_idty))
-        self.next_wot.add_edge(from_idty, to_idty, attr_dict={'time': self.turn})
-        self.past_links.append((self.turn, from_idty, to_idty))
+        self.events.emit(LINK_ADDED, from_idty, to_idty, self.turn)
+        self.issuers.issued(from_idty, self.turn, not self.wot.has_edge(from_idty, to_idty))
+        self.wot.add_edge(from_idty, to_idty, attr_dict={'time': self.turn})
+        self._schedule_expiration(from_idty, to_idty, self.turn)
+        self.sentry_tracker.update(from_idty, self.issuers.count(from_idty))
+        self.past_links.append(self.turn, from_idty, to_idty)
 
         # Checks if the certified individual must join the wot as a member
-        if to_idty not in self.next_members and self.can_join(self.next_wot, to_idty):
-            print("{0} : Joining members".format(to_idty))
+        if to_idty not in self.next_members and self.can_join(self.wot, to_idty):
+            self.events.emit(JOINED, to_idty, self.turn)
 
             # Keep track of memberships in time
             if to_idty not in self.history:
@@ -132,19 +175,42 @@ class WoT:
 
             self.history[to_idty].append(self.turn)
             self.next_members.append(to_idty)
+            self.stats.count('joined')
+
+    def _schedule_expiration(self, from_idty, to_idty, time):
+        """
+        Register a certification to be checked for expiration at the end of its validity
+        :param from_idty: Public key of the issuer
+        :param to_idty: Public key of the certified individual
+        :param time: Block number of the certification
+        """
+        self.expirations.setdefault(time + self.sig_validity + 1, []).append((from_idty, to_idty))
 
     def ySentries(self, N):
-        Y = {
-            10: 2,
-            100: 4,
-            1000: 6,
-            10000: 12,
-            100000: 20
-        }
-        for k in reversed(sorted(Y.keys())):
-            if N >= k:
-                return Y[k]
-        return 0
+        return y_sentries(N)
+
+    def linked(self, wot, idty):
+        """
+        Extract all the identities connected to idty at steps_max via certificates (edges).
+        The search walks the predecessors adjacency that networkx keeps up to date,
+        which is the reversed graph without having to copy it.
+        :param wot:     Graph to analyse
+        :param idty:    Pubkey of the candidate
+        :return: Set of pubkeys, including idty
+        """
+        linked = {idty}
+        frontier = [idty]
+        step = 0
+        while frontier and (not self.steps_max or step < self.steps_max):
+            step += 1
+            next_frontier = []
+            for node in frontier:
+                for pred in wot.pred[node]:
+                    if pred not in linked:
+                        linked.add(pred)
+                        next_frontier.append(pred)
+            frontier = next_frontier
+        return linked
 
     def can_join(self, wot, idty):
         """
@@ -156,8 +222,11 @@ class WoT:
         """
 
         # Extract the list of all connected members to idty at steps_max via certificates (edges)
-        linked = networkx.predecessor(wot.reverse(copy=True), idty, cutoff=self.steps_max)
-        sentries = [m for m in self.members if len(wot.out_edges(m)) > self.ySentries(len(self.members))]
+        with self.stats.phase('distance'):
+            linked = self.linked(wot, idty)
+        self.stats.count('candidates')
+        self.stats.count('visited', len(linked))
+        sentries = self.sentry_tracker.sentries
         # List all sentries connected at steps_max from idty
         linked_in_range = [l for l in linked if l in sentries
                            and l != idty]
@@ -165,16 +234,14 @@ class WoT:
         # Checks if idty is connected to at least xpercent of sentries
         enough_sentries = len(linked_in_range) >= len(sentries)*self.xpercent
         if not enough_sentries:
-            print("{0} : Cannot join : not enough sentries ({1}/{2})".format(idty,
-                                                                             len(linked_in_range),
-                                                                             len(sentries)*self.xpercent))
+            self.events.emit(JOIN_REFUSED, idty, NOT_ENOUGH_SENTRIES, len(linked_in_range),
+                             len(sentries)*self.xpercent)
 
         # Checks if idty has enough certificates to be a member
         enough_certs = len(wot.in_edges(idty)) >= self.sig_qty
         if not enough_certs:
-            print("{0} : Cannot join : not enough certifications ({1}/{2}".format(idty,
-                                                                                  len(wot.in_edges(idty)),
-                                                                                  self.sig_qty))
+            self.events.emit(JOIN_REFUSED, idty, NOT_ENOUGH_CERTIFICATIONS, len(wot.in_edges(idty)),
+                             self.sig_qty)
 
         return enough_certs and enough_sentries
 
@@ -184,51 +251,52 @@ class WoT:
         """
         self.turn += 1
         dropped_links = []
-        print("== New turn {0} ==".format(self.turn))
+        self.events.emit(NEW_TURN, self.turn)
         # Links expirations
-        for link in self.next_wot.copy().edges(data=True):
-            if self.turn > link[2]['time'] + self.sig_validity:
-                print("{0} -> {1} : Link expired ({2}/{3})".format(link[0], link[1],
-                                                                   self.turn, link[2]['time'] + self.sig_validity))
-                self.next_wot.remove_edge(link[0], link[1])
-                dropped_links.append(link)
+        with self.stats.phase('expiry'):
+            for (source, target) in self.expirations.pop(self.turn, []):
+                link = self.wot.get_edge_data(source, target)
+                # The link may have been renewed or already removed since it was scheduled
+                if link is not None and self.turn > link['time'] + self.sig_validity:
+                    self.events.emit(LINK_EXPIRED, source, target, self.turn)
+                    self.wot.remove_edge(source, target)
+                    self.issuers.expired(source)
+                    self.sentry_tracker.update(source, self.issuers.count(source))
+                    dropped_links.append((source, target, link))
+        self.stats.set('expired', len(dropped_links))
 
         for link in dropped_links:
-            if link[0] in self.next_members and not self.can_join(self.next_wot, link[0]):
-                print("{0} : Left community".format(link[0]))
+            if link[0] in self.next_members and not self.can_join(self.wot, link[0]):
+                self.events.emit(LEFT, link[0], self.turn)
                 self.next_members.remove(link[0])
+                self.stats.count('left')
                 if link[0] in self.history:
                     self.history[link[0]].append(self.turn)
 
-        self.wot = self.next_wot
+        with self.stats.phase('sentries'):
+            for node in set(self.members).difference(self.next_members):
+                self.sentry_tracker.leave(node)
+            for node in set(self.next_members).difference(self.members):
+                self.sentry_tracker.join(node)
         self.members = self.next_members
-        #elf.layouts.append(graphviz_layout(self.wot, "twopi"))
+        self.stats.set('members', len(self.members))
+        self.stats.set('identities', self.wot.number_of_nodes())
+        self.stats.end_turn()
         self._prepare_next_turn()
 
-    def draw(self, zscale=1):
+    def draw(self, zscale=1, max_links=None):
+        """
+        Draw the memberships and certifications of all the turns in 3d
+        :param zscale: Height of a turn
+        :param max_links: Maximum number of certifications drawn, None to draw them all
+        """
         for n in self.history:
             if len(self.history[n]) % 2 != 0:
                 self.history[n].append(self.turn)
         pos = graphviz_layout(self.wot, "twopi")
 
-        for n in self.history:
-            periods = list(zip(self.history[n], self.history[n][1:]))
-            for i, p in enumerate(periods):
-                nbpoints = abs(p[1] - p[0])*zscale
-                zline = linspace(p[0]*zscale, p[1]*zscale, nbpoints)
-                xline = linspace(pos[n][0], pos[n][0], nbpoints)
-                yline = linspace(pos[n][1], pos[n][1], nbpoints)
-                plot = self.ax.plot(xline, zline, yline, zdir='y', color=self.colors[n][0], alpha=1/(i % 2 + 1))
-
-        for link in self.past_links:
-            nbpoints = abs(pos[link[2]][0] - pos[link[1]][1])*zscale
-            zline = linspace(link[0]*zscale, link[0]*zscale, nbpoints)
-            xline = linspace(pos[link[2]][0], pos[link[1]][0], nbpoints)
-            yline = linspace(pos[link[2]][1], pos[link[1]][1], nbpoints)
-            if link[1] in self.colors:
-                self.ax.plot(xline, zline, yline, zdir='y', color=self.colors[link[1]][0], alpha=0.1)
-
-            #txt = self.ax.text(pos[n][0], pos[n][1], self.history[n][0]*zscale, n[:5], 'z')
+        draw_timeline(self.ax, pos, self.history, list(self.past_links), self.colors, zscale,
+                      alphas=(1., 0.5), max_links=max_links)
 
         self.ax.set_xlim3d(-5, max([p[0] for p in pos.values()]))
         self.ax.set_ylim3d(-5, max([p[1] for p in pos.values()]))